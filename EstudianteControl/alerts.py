@@ -0,0 +1,255 @@
+"""Detección periódica de alumnos en riesgo.
+
+Cada corrida evalúa solo a los alumnos con registros nuevos desde la anterior
+(según el último id visto de cada tabla de historial, en ``alert_watermarks``)
+y guarda el resultado en ``alerts``, que la app lee directamente. Con muchos
+alumnos la evaluación se reparte en un pool de procesos.
+
+Pensado para correr desde cron o como proceso aparte::
+
+    python alerts.py scan            # una corrida incremental
+    python alerts.py scan --full     # reevaluar a todos
+    python alerts.py watch --interval 3600
+
+Las alertas nuevas se envían con el emisor de ALERT_SENDER: ``log`` (por
+defecto, solo registra) o ``twilio`` (SMS a ALERT_SMS_TO).
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, update, insert, tuple_
+
+from data_manager import (
+    Student, Attendance, Behavior, Assignment, Alert, AlertWatermark, get_engine
+)
+from utils import PRESENT_STATUS
+
+logger = logging.getLogger(__name__)
+
+ATTENDANCE_MIN = float(os.getenv('ALERT_ATTENDANCE_MIN', '80'))
+ATTENDANCE_DAYS = int(os.getenv('ALERT_ATTENDANCE_DAYS', '30'))
+BEHAVIOR_MIN = float(os.getenv('ALERT_BEHAVIOR_MIN', '5'))
+BEHAVIOR_DROP = float(os.getenv('ALERT_BEHAVIOR_DROP', '2'))
+BEHAVIOR_DAYS = int(os.getenv('ALERT_BEHAVIOR_DAYS', '90'))
+BEHAVIOR_RECENT = 4
+LATE_MAX = int(os.getenv('ALERT_LATE_MAX', '3'))
+LATE_DAYS = int(os.getenv('ALERT_LATE_DAYS', '30'))
+LATE_STATUS = 'Atrasado'
+
+POOL_MIN_STUDENTS = int(os.getenv('ALERT_POOL_MIN_STUDENTS', '500'))
+FETCH_CHUNK = 1000
+
+HISTORY_TABLES = [Attendance, Behavior, Assignment]
+
+def evaluate(attendance, behavior, assignments, today):
+    """Evalúa los umbrales para los alumnos presentes en los frames. Devuelve una lista de dicts."""
+    import pandas as pd
+
+    alerts = []
+
+    recent = attendance[pd.to_datetime(attendance['date']) >= pd.Timestamp(today - timedelta(days=ATTENDANCE_DAYS))]
+    rates = recent['status'].eq(PRESENT_STATUS).groupby(recent['student_id']).mean() * 100
+    for student_id, rate in rates[rates < ATTENDANCE_MIN].items():
+        alerts.append({
+            'student_id': int(student_id), 'kind': 'asistencia', 'value': round(float(rate), 1),
+            'message': f"Asistencia de {rate:.0f}% en los últimos {ATTENDANCE_DAYS} días"
+        })
+
+    ordered = behavior.sort_values(['student_id', 'date'])
+    last = ordered.groupby('student_id').tail(2 * BEHAVIOR_RECENT)
+    position = last.groupby('student_id').cumcount(ascending=False)
+    recent_avg = last[position < BEHAVIOR_RECENT].groupby('student_id')['score'].mean()
+    previous_avg = last[position >= BEHAVIOR_RECENT].groupby('student_id')['score'].mean()
+    drop = (previous_avg - recent_avg).reindex(recent_avg.index)
+    for student_id, average in recent_avg.items():
+        if average < BEHAVIOR_MIN:
+            message = f"Promedio de conducta {average:.1f} en las últimas notas"
+        elif drop.get(student_id, 0) >= BEHAVIOR_DROP:
+            message = f"La conducta bajó {drop[student_id]:.1f} puntos (ahora {average:.1f})"
+        else:
+            continue
+        alerts.append({'student_id': int(student_id), 'kind': 'conducta', 'value': round(float(average), 2), 'message': message})
+
+    late = assignments[
+        assignments['status'].eq(LATE_STATUS)
+        & (pd.to_datetime(assignments['date']) >= pd.Timestamp(today - timedelta(days=LATE_DAYS)))
+    ].groupby('student_id').size()
+    for student_id, count in late[late >= LATE_MAX].items():
+        alerts.append({
+            'student_id': int(student_id), 'kind': 'trabajos', 'value': float(count),
+            'message': f"{count} trabajos atrasados en los últimos {LATE_DAYS} días"
+        })
+
+    return alerts
+
+def _evaluate_chunk(args):
+    return evaluate(*args)
+
+def _changed_students(connection, watermarks, full):
+    """Alumnos con registros nuevos y el id máximo actual de cada tabla."""
+    maxima = {
+        model.__tablename__: connection.execute(select(func.max(model.id))).scalar() or 0
+        for model in HISTORY_TABLES
+    }
+    if full:
+        return set(connection.execute(select(Student.id)).scalars()), maxima
+
+    changed = set()
+    for model in HISTORY_TABLES:
+        last_id = watermarks.get(model.__tablename__, 0)
+        changed.update(connection.execute(
+            select(model.student_id).distinct().where(model.id > last_id, model.id <= maxima[model.__tablename__])
+        ).scalars())
+    return changed, maxima
+
+def _fetch_frames(connection, student_ids, today):
+    import pandas as pd
+
+    specs = [
+        ('attendance', Attendance, [Attendance.status], ATTENDANCE_DAYS),
+        ('behavior', Behavior, [Behavior.score], BEHAVIOR_DAYS),
+        ('assignments', Assignment, [Assignment.status], LATE_DAYS)
+    ]
+    ids = sorted(student_ids)
+    frames = {}
+    for key, model, columns, days in specs:
+        parts = []
+        for start in range(0, len(ids), FETCH_CHUNK):
+            query = select(model.student_id, model.date, *columns).where(
+                model.student_id.in_(ids[start:start + FETCH_CHUNK]),
+                model.date >= today - timedelta(days=days)
+            )
+            parts.append(pd.read_sql(query, connection))
+        frames[key] = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+            columns=['student_id', 'date'] + [c.key for c in columns]
+        )
+    return frames
+
+def _evaluate_all(frames, student_ids, today, workers):
+    if workers <= 1 or len(student_ids) < POOL_MIN_STUDENTS:
+        return evaluate(frames['attendance'], frames['behavior'], frames['assignments'], today)
+
+    ids = sorted(student_ids)
+    size = -(-len(ids) // workers)
+    chunks = []
+    for start in range(0, len(ids), size):
+        chunk_ids = set(ids[start:start + size])
+        chunks.append(tuple(
+            frame[frame['student_id'].isin(chunk_ids)]
+            for frame in (frames['attendance'], frames['behavior'], frames['assignments'])
+        ) + (today,))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [alert for result in pool.map(_evaluate_chunk, chunks) for alert in result]
+
+def scan(engine, full=False, workers=None, sender=None, today=None):
+    """Corre una evaluación incremental y devuelve las alertas nuevas enviadas."""
+    today = today or datetime.now().date()
+    workers = workers or os.cpu_count() or 1
+    sender = sender or get_sender()
+    started = time.perf_counter()
+
+    with engine.connect() as connection:
+        watermarks = dict(connection.execute(select(AlertWatermark.table_name, AlertWatermark.last_id)).all())
+        student_ids, maxima = _changed_students(connection, watermarks, full)
+        frames = _fetch_frames(connection, student_ids, today) if student_ids else None
+        connection.rollback()
+
+    alerts = _evaluate_all(frames, student_ids, today, workers) if student_ids else []
+    now = datetime.now()
+
+    with engine.begin() as connection:
+        previous = set()
+        if student_ids:
+            ids = sorted(student_ids)
+            for start in range(0, len(ids), FETCH_CHUNK):
+                chunk = ids[start:start + FETCH_CHUNK]
+                previous.update(connection.execute(
+                    select(Alert.student_id, Alert.kind).where(Alert.active.is_(True), Alert.student_id.in_(chunk))
+                ).all())
+                connection.execute(
+                    update(Alert).where(Alert.active.is_(True), Alert.student_id.in_(chunk)).values(active=False)
+                )
+        if alerts:
+            connection.execute(insert(Alert), [dict(alert, created_at=now, active=True) for alert in alerts])
+        for table_name, last_id in maxima.items():
+            updated = connection.execute(
+                update(AlertWatermark).where(AlertWatermark.table_name == table_name).values(last_id=last_id)
+            )
+            if updated.rowcount == 0:
+                connection.execute(insert(AlertWatermark).values(table_name=table_name, last_id=last_id))
+
+    new_alerts = [a for a in alerts if (a['student_id'], a['kind']) not in previous]
+    if new_alerts:
+        sender.send(new_alerts)
+        with engine.begin() as connection:
+            connection.execute(
+                update(Alert)
+                .where(Alert.active.is_(True), Alert.created_at == now,
+                       tuple_(Alert.student_id, Alert.kind).in_([(a['student_id'], a['kind']) for a in new_alerts]))
+                .values(notified_at=datetime.now())
+            )
+
+    logger.info(
+        "Alertas: %d alumnos evaluados, %d alertas vigentes, %d nuevas en %.2fs",
+        len(student_ids), len(alerts), len(new_alerts), time.perf_counter() - started
+    )
+    return new_alerts
+
+class LogSender:
+    """Emisor local: registra las alertas y las guarda en ``sent`` (útil en pruebas)."""
+    def __init__(self):
+        self.sent = []
+
+    def send(self, alerts):
+        for alert in alerts:
+            logger.info("Alerta para alumno %s: %s", alert['student_id'], alert['message'])
+        self.sent.extend(alerts)
+
+class TwilioSender:
+    """Envía un resumen por SMS con Twilio (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM, ALERT_SMS_TO)."""
+    def __init__(self):
+        from twilio.rest import Client
+
+        self.client = Client(os.environ['TWILIO_ACCOUNT_SID'], os.environ['TWILIO_AUTH_TOKEN'])
+        self.from_number = os.environ['TWILIO_FROM']
+        self.to_numbers = [n.strip() for n in os.environ['ALERT_SMS_TO'].split(',') if n.strip()]
+
+    def send(self, alerts):
+        body = f"{len(alerts)} alertas nuevas de alumnos en riesgo:\n" + "\n".join(
+            f"- Alumno {a['student_id']}: {a['message']}" for a in alerts[:10]
+        )
+        for number in self.to_numbers:
+            self.client.messages.create(body=body[:1500], from_=self.from_number, to=number)
+
+SENDERS = {'log': LogSender, 'twilio': TwilioSender}
+
+def get_sender():
+    return SENDERS[os.getenv('ALERT_SENDER', 'log')]()
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Cálculo de alertas de alumnos en riesgo")
+    parser.add_argument('command', choices=['scan', 'watch'])
+    parser.add_argument('--full', action='store_true', help="reevaluar a todos los alumnos")
+    parser.add_argument('--workers', type=int, help="procesos del pool (por defecto, CPUs)")
+    parser.add_argument('--interval', type=int, default=3600, help="segundos entre corridas con watch")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    if args.command == 'scan':
+        scan(engine, full=args.full, workers=args.workers)
+        return
+
+    while True:
+        try:
+            scan(engine, workers=args.workers)
+        except Exception:
+            logger.exception("Error en la corrida de alertas")
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Versiones vectorizadas de los cálculos de utils para cursos o escuelas enteras.
+
+Las funciones reciben DataFrames en formato largo (una fila por registro) con
+una columna de agrupación, por defecto ``student_id``.
+"""
+import numpy as np
+import pandas as pd
+
+from utils import PRESENT_STATUS, DELIVERED_STATUS
+
+def attendance_rates(attendance, by='student_id'):
+    """Porcentaje de asistencias 'Presente' por grupo (como calculate_attendance_percentage)."""
+    present = attendance['status'].eq(PRESENT_STATUS)
+    return (present.groupby(attendance[by]).mean() * 100).rename('attendance_rate')
+
+def behavior_averages(behavior, by='student_id'):
+    """Promedio de conducta por grupo (como calculate_behavior_average)."""
+    return behavior.groupby(by)['score'].mean().rename('behavior_avg')
+
+def assignment_completion(assignments, by='student_id'):
+    """Trabajos entregados y totales por grupo (como calculate_assignment_completion)."""
+    delivered = assignments['status'].eq(DELIVERED_STATUS)
+    return delivered.groupby(assignments[by]).agg(delivered='sum', total='size')
+
+def student_metrics(students, attendance, behavior, assignments):
+    """Tabla de resumen por alumno con las mismas columnas que DataManager.get_course_summary.
+
+    ``students`` necesita las columnas ``student_id`` y ``name``.
+    """
+    metrics = students.set_index('student_id')[['name']]
+    metrics = metrics.join(attendance_rates(attendance)).join(behavior_averages(behavior))
+    metrics = metrics.join(assignment_completion(assignments))
+    metrics = metrics.fillna({'attendance_rate': 0, 'behavior_avg': 0, 'delivered': 0, 'total': 0})
+    return pd.DataFrame({
+        'Alumno': metrics['name'],
+        'Asistencia (%)': metrics['attendance_rate'].round(2),
+        'Promedio Conducta': metrics['behavior_avg'].round(2),
+        'Trabajos Entregados': metrics['delivered'].astype(int),
+        'Total Trabajos': metrics['total'].astype(int)
+    }).reset_index(drop=True)
+
+def rolling_attendance_rate(attendance, window='28D', by='student_id'):
+    """Tasa de asistencia en una ventana móvil de tiempo, por grupo y por día.
+
+    Se agregan primero los registros por (grupo, día) para que la tasa quede
+    ponderada por cantidad de registros, también al agrupar por curso.
+    """
+    daily = (
+        attendance.assign(
+            date=pd.to_datetime(attendance['date']),
+            present=attendance['status'].eq(PRESENT_STATUS).astype(np.int64)
+        )
+        .groupby([by, 'date'])['present']
+        .agg(present='sum', total='size')
+        .reset_index(level=by)
+        .sort_index()
+    )
+    rolled = daily.groupby(by)[['present', 'total']].rolling(window).sum()
+    rate = (rolled['present'] / rolled['total'] * 100).rename('attendance_rate')
+    return rate.reset_index()
+
+def behavior_moving_average(behavior, periods=4, by='student_id'):
+    """Promedio móvil de conducta de los últimos ``periods`` días con notas, por grupo.
+
+    Como en rolling_attendance_rate, se agregan primero las notas por (grupo,
+    día), así que hay un solo valor por fecha y el promedio queda ponderado
+    por cantidad de notas también al agrupar por curso.
+    """
+    daily = (
+        behavior.assign(date=pd.to_datetime(behavior['date']))
+        .groupby([by, 'date'])['score']
+        .agg(total='sum', count='size')
+        .reset_index()
+    )
+    rolled = daily.groupby(by)[['total', 'count']].rolling(periods, min_periods=1).sum().reset_index(level=0, drop=True)
+    return daily[[by, 'date']].assign(behavior_ma=rolled['total'] / rolled['count'])
+
+def course_overview(summary):
+    """Métricas por curso a partir del resumen por alumno (DataManager.get_school_summary)."""
+    overview = summary.groupby('Curso').agg(**{
+        'Alumnos': ('Alumno', 'size'),
+        'Asistencia (%)': ('Asistencia (%)', 'mean'),
+        'Promedio Conducta': ('Promedio Conducta', 'mean'),
+        'Trabajos Entregados': ('Trabajos Entregados', 'sum'),
+        'Total Trabajos': ('Total Trabajos', 'sum')
+    })
+    delivered = overview['Trabajos Entregados'] / overview['Total Trabajos'].replace(0, np.nan) * 100
+    overview['Entrega de Trabajos (%)'] = delivered.fillna(0)
+    return overview.round(2).reset_index()
+
+def behavior_series(behavior, max_points=60):
+    """Promedio de conducta de un alumno por día, semana o mes (como DataManager.get_behavior_series).
+
+    ``behavior`` tiene las columnas ``date`` y ``score`` de un solo alumno.
+    """
+    if behavior.empty:
+        return pd.DataFrame(columns=['date', 'score', 'count'])
+
+    dates = pd.to_datetime(behavior['date'])
+    span = (dates.max() - dates.min()).days + 1
+    if span <= max_points:
+        bucket = dates
+    elif span / 7 <= max_points:
+        bucket = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    else:
+        bucket = dates.dt.to_period('M').dt.start_time
+    series = (
+        behavior.groupby(bucket.dt.date.rename('date'))['score']
+        .agg(total='sum', count='size')
+        .reset_index()
+    )
+    if len(series) > max_points:
+        group = pd.Series(range(len(series))) // -(-len(series) // max_points)
+        series = series.groupby(group).agg(date=('date', 'first'), total=('total', 'sum'), count=('count', 'sum'))
+    series['score'] = (series['total'] / series['count']).round(2)
+    return series[['date', 'score', 'count']].reset_index(drop=True)
@@ -0,0 +1,6 @@
+"""Benchmarks de DataManager sobre SQLite con una escuela sintética.
+
+Uso (desde EstudianteControl/):
+
+    python -m benchmarks.run --courses 50 --students 40 --years 3 --output bench.json
+"""
@@ -0,0 +1,105 @@
+"""Verificación de WriteBatch: ítems válidos e inválidos en un mismo lote.
+
+Carga un lote con registros correctos y otros que deben rechazarse (estados
+que no corresponden al tipo, calificaciones fuera de rango, textos vacíos,
+alumnos inexistentes) y verifica el resultado de cada ítem, lo guardado en
+la base y los totales de student_stats. Sin --url usa un archivo SQLite
+temporal.
+
+Uso (desde EstudianteControl/):
+
+    python -m benchmarks.batch
+    python -m benchmarks.batch --url postgresql://localhost/escuela_test
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+from sqlalchemy import create_engine, func, select
+
+from data_manager import Assignment, Attendance, Behavior, DataManager, Note, StudentStats, migrate
+
+COURSE = 'Lote'
+
+def run(manager):
+    """Devuelve la lista de fallas encontradas."""
+    failures = []
+    manager.add_course(COURSE)
+    manager.add_student(COURSE, {'nombre': 'Ana', 'apellido': 'Lote'})
+    student_id = manager.get_students(COURSE)[0][0]
+    day = str(date.today())
+
+    expected = []
+    with manager.batch() as batch:
+        batch.add_attendance(student_id, 'Presente', day)
+        expected.append(True)
+        batch.add_attendance(student_id, 'Entregado', day)
+        expected.append(False)
+        batch.add_attendance(student_id, '', day)
+        expected.append(False)
+        batch.add_assignment(student_id, 'Mapa', 'Entregado', day)
+        expected.append(True)
+        batch.add_assignment(student_id, 'Mapa', 'Presente', day)
+        expected.append(False)
+        batch.add_behavior_note(student_id, 8, 'Participa', day)
+        expected.append(True)
+        batch.add_behavior_note(student_id, 99, 'Fuera de rango', day)
+        expected.append(False)
+        batch.add_behavior_note(student_id, 0, 'Fuera de rango', day)
+        expected.append(False)
+        batch.add_note(student_id, 'Trajo la autorización', day)
+        expected.append(True)
+        batch.add_note(student_id, '', day)
+        expected.append(False)
+        batch.add_attendance(student_id + 1000, 'Presente', day)
+        expected.append(False)
+
+    for index, (result, ok) in enumerate(zip(batch.results, expected)):
+        if result['ok'] != ok:
+            failures.append(f"ítem {index} ({result['operation']}): ok={result['ok']}, se esperaba {ok}")
+        if not ok and not result['error']:
+            failures.append(f"ítem {index} ({result['operation']}): rechazado sin mensaje de error")
+    if len(batch.results) != len(expected):
+        failures.append(f"{len(batch.results)} resultados para {len(expected)} ítems")
+
+    with manager.engine.connect() as connection:
+        for model, rows in ((Attendance, 1), (Assignment, 1), (Behavior, 1), (Note, 1)):
+            count = connection.execute(select(func.count()).select_from(model)).scalar()
+            if count != rows:
+                failures.append(f"{model.__tablename__}: {count} filas, se esperaban {rows}")
+        stats = connection.execute(select(StudentStats).where(StudentStats.student_id == student_id)).one()
+        totals = (stats.attendance_total, stats.attendance_present, stats.behavior_count,
+                  stats.behavior_sum, stats.assignments_total, stats.assignments_delivered)
+        if totals != (1, 1, 1, 8, 1, 1):
+            failures.append(f"student_stats {totals}, se esperaba (1, 1, 1, 8, 1, 1)")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verificación de WriteBatch")
+    parser.add_argument('--url', help="base de datos vacía a usar (por defecto, SQLite temporal)")
+    args = parser.parse_args(argv)
+
+    path = None
+    if args.url:
+        engine = create_engine(args.url)
+    else:
+        fd, path = tempfile.mkstemp(suffix='.db', prefix='batch_')
+        os.close(fd)
+        engine = create_engine(f'sqlite:///{path}')
+
+    try:
+        migrate(engine)
+        failures = run(DataManager(engine))
+        for failure in failures:
+            print(f"FALLA: {failure}")
+        print("OK" if not failures else f"{len(failures)} fallas")
+        return not failures
+    finally:
+        engine.dispose()
+        if path:
+            os.remove(path)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
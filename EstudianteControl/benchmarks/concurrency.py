@@ -0,0 +1,113 @@
+"""Prueba de concurrencia: muchos hilos usando el mismo DataManager a la vez.
+
+Simula varios docentes creando el mismo curso, dando de alta alumnos y
+cargando asistencia en paralelo, y verifica al final que no se perdieron ni
+duplicaron datos. Sin --url usa un archivo SQLite temporal.
+
+Uso (desde EstudianteControl/):
+
+    python -m benchmarks.concurrency --threads 16 --operations 50
+    python -m benchmarks.concurrency --url postgresql://localhost/escuela_test
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, func, select
+
+from data_manager import Attendance, Course, DataManager, Student, StudentStats, migrate
+
+COURSE = 'Concurrencia'
+
+def worker(manager, index, operations, barrier, failures):
+    barrier.wait()
+    created = manager.add_course(COURSE)
+    student = {'nombre': f"Hilo{index}", 'apellido': f"Prueba{index:03d}"}
+    if not manager.add_student(COURSE, student):
+        failures.append(f"hilo {index}: add_student")
+        return created, None
+
+    student_id = next(sid for sid, name in manager.get_students(COURSE) if name == f"Prueba{index:03d}, Hilo{index}")
+    start = date(2024, 3, 1)
+    for day in range(operations):
+        status = 'Presente' if day % 3 else 'Ausente'
+        if not manager.add_attendance(student_id, status, str(start + timedelta(days=day))):
+            failures.append(f"hilo {index}: add_attendance día {day}")
+        manager.cache.clear()
+        manager.get_student_data(student_id)
+        manager.get_courses()
+    return created, student_id
+
+def check(engine, threads, operations, created, failures):
+    with engine.connect() as connection:
+        courses = connection.execute(select(func.count()).where(Course.name == COURSE)).scalar()
+        students = connection.execute(
+            select(func.count()).select_from(Student).join(Course).where(Course.name == COURSE)
+        ).scalar()
+        attendance = connection.execute(select(func.count()).select_from(Attendance)).scalar()
+        stats_total = connection.execute(select(func.sum(StudentStats.attendance_total))).scalar()
+
+    if created.count(True) != 1:
+        failures.append(f"add_course devolvió True {created.count(True)} veces")
+    if courses != 1:
+        failures.append(f"{courses} cursos '{COURSE}'")
+    if students != threads:
+        failures.append(f"{students} alumnos, se esperaban {threads}")
+    if attendance != threads * operations:
+        failures.append(f"{attendance} asistencias, se esperaban {threads * operations}")
+    if stats_total != attendance:
+        failures.append(f"student_stats suma {stats_total} asistencias, la tabla tiene {attendance}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de concurrencia de DataManager")
+    parser.add_argument('--url', help="base de datos vacía a usar (por defecto, SQLite temporal)")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--operations', type=int, default=25, help="asistencias por hilo")
+    args = parser.parse_args(argv)
+
+    path = None
+    if args.url:
+        engine = create_engine(args.url, pool_size=args.threads, max_overflow=0)
+    else:
+        fd, path = tempfile.mkstemp(suffix='.db', prefix='concurrency_')
+        os.close(fd)
+        engine = create_engine(f'sqlite:///{path}', pool_size=args.threads, max_overflow=0)
+
+    try:
+        migrate(engine)
+        manager = DataManager(engine)
+        barrier = threading.Barrier(args.threads)
+        failures, results = [], [None] * args.threads
+
+        def run(index):
+            try:
+                results[index] = worker(manager, index, args.operations, barrier, failures)
+            except Exception as e:
+                failures.append(f"hilo {index}: {e!r}")
+                results[index] = (False, None)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        check(engine, args.threads, args.operations, [created for created, _ in results], failures)
+        print(f"{args.threads} hilos x {args.operations} operaciones en {elapsed:.2f}s")
+        for failure in failures:
+            print(f"FALLA: {failure}")
+        print("OK" if not failures else f"{len(failures)} fallas")
+        return not failures
+    finally:
+        engine.dispose()
+        if path:
+            os.remove(path)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,76 @@
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from data_manager import migrate, Course, Student, Attendance, Behavior, Assignment, Note, refresh_stats
+
+ATTENDANCE_STATUSES = ["Presente"] * 17 + ["Ausente"] * 2 + ["Tardanza"]
+ASSIGNMENT_STATUSES = ["Entregado"] * 7 + ["Pendiente"] * 2 + ["Atrasado"]
+NOTE_WORDS = ["tarea", "recreo", "examen", "familia", "conducta", "participación", "bullying", "lectura"]
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elena", "Facundo", "Gala", "Hernán", "Inés", "Joaquín"]
+LAST_NAMES = ["Pérez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Romero", "Sosa", "Ruiz", "Álvarez"]
+
+def school_days(years, end=None):
+    """Días hábiles (lunes a viernes) de los últimos ``years`` años."""
+    end = end or date.today()
+    day = end - timedelta(days=365 * years)
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+def _flush(connection, model, rows, counts):
+    if rows:
+        connection.execute(insert(model), rows)
+        counts[model.__tablename__] += len(rows)
+        rows.clear()
+
+def generate_school(engine, courses=5, students_per_course=30, years=1,
+                    behavior_every=10, assignment_every=7, note_every=20,
+                    seed=0, batch_size=5000):
+    """Crea el esquema y carga una escuela sintética. Devuelve la cantidad de filas por tabla."""
+    rng = random.Random(seed)
+    migrate(engine)
+    days = list(school_days(years))
+    counts = {'courses': courses, 'students': courses * students_per_course,
+              'attendances': 0, 'behaviors': 0, 'assignments': 0, 'notes': 0}
+
+    with engine.begin() as connection:
+        connection.execute(insert(Course), [{'id': c + 1, 'name': f"Curso {c + 1:03d}"} for c in range(courses)])
+        connection.execute(insert(Student), [
+            {
+                'id': c * students_per_course + s + 1,
+                'course_id': c + 1,
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': f"{rng.choice(LAST_NAMES)} {s + 1}"
+            }
+            for c in range(courses) for s in range(students_per_course)
+        ])
+
+        attendances, behaviors, assignments, notes = [], [], [], []
+        for student_id in range(1, counts['students'] + 1):
+            for index, day in enumerate(days):
+                attendances.append({'student_id': student_id, 'date': day, 'status': rng.choice(ATTENDANCE_STATUSES)})
+                if index % behavior_every == 0:
+                    behaviors.append({'student_id': student_id, 'date': day, 'score': rng.randint(1, 10),
+                                      'description': " ".join(rng.sample(NOTE_WORDS, 3))})
+                if index % assignment_every == 0:
+                    assignments.append({'student_id': student_id, 'date': day, 'title': f"Trabajo {index}",
+                                        'status': rng.choice(ASSIGNMENT_STATUSES)})
+                if index % note_every == 0:
+                    notes.append({'student_id': student_id, 'date': day, 'content': " ".join(rng.sample(NOTE_WORDS, 4))})
+
+            for model, rows in ((Attendance, attendances), (Behavior, behaviors),
+                                (Assignment, assignments), (Note, notes)):
+                if len(rows) >= batch_size:
+                    _flush(connection, model, rows, counts)
+
+        for model, rows in ((Attendance, attendances), (Behavior, behaviors),
+                            (Assignment, assignments), (Note, notes)):
+            _flush(connection, model, rows, counts)
+
+        refresh_stats(connection)
+
+    return counts
@@ -0,0 +1,270 @@
+"""Prueba de carga de la app con varios docentes simultáneos.
+
+Cada usuario simulado es un ``AppTest`` de main.py corriendo en su propio
+hilo, como las sesiones del servidor de Streamlit, y repite una mezcla de
+acciones (elegir curso, cambiar de alumno, registrar asistencia, abrir la
+vista general, exportar) sobre una escuela sintética. Para cada nivel de
+concurrencia informa percentiles de latencia de rerun, conexiones de la base
+en uso y memoria por sesión.
+
+Uso (desde EstudianteControl/):
+
+    python -m benchmarks.load --levels 1 2 4 8 --actions 20 --output load.json
+    python -m benchmarks.load --compare load.json --max-regression 1.5
+    python -m benchmarks.load --url postgresql://localhost/escuela_carga
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+
+from benchmarks.generator import generate_school
+from benchmarks.run import git_revision, percentile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(APP_DIR, 'main.py')
+
+ACTIONS = {
+    'select_course': 15,
+    'switch_student': 35,
+    'record_attendance': 25,
+    'open_overview': 15,
+    'export': 10
+}
+
+def _selectbox(app, label):
+    for box in app.selectbox:
+        if box.label == label:
+            return box
+    return None
+
+def _button(app, label):
+    for button in app.button:
+        if button.label == label:
+            return button
+    return None
+
+class User:
+    """Un docente simulado: un AppTest propio y las latencias de cada rerun."""
+    def __init__(self, rng):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = rng
+        self.app = AppTest.from_file(MAIN, default_timeout=120)
+        self.latencies = []
+        self.errors = 0
+
+    def _timed(self, element):
+        start = time.perf_counter()
+        element.run()
+        self.latencies.append(time.perf_counter() - start)
+        self.errors += len(self.app.exception)
+
+    def _goto(self, page):
+        navigation = self.app.sidebar.selectbox[0]
+        if navigation.value != page:
+            self._timed(navigation.select(page))
+
+    def _student_selected(self):
+        self._goto("Gestión de Alumnos")
+        box = _selectbox(self.app, "Seleccionar Alumno")
+        if box is not None and box.value is None and len(box.options) > 1:
+            self._timed(box.select_index(self.rng.randrange(1, len(box.options))))
+
+    def start(self):
+        self._timed(self.app)
+
+    def select_course(self):
+        self._goto("Gestión de Alumnos")
+        box = _selectbox(self.app, "Seleccionar Curso")
+        if box is not None:
+            self._timed(box.select_index(self.rng.randrange(len(box.options))))
+
+    def switch_student(self):
+        self._goto("Gestión de Alumnos")
+        box = _selectbox(self.app, "Seleccionar Alumno")
+        if box is not None and len(box.options) > 1:
+            self._timed(box.select_index(self.rng.randrange(1, len(box.options))))
+
+    def record_attendance(self):
+        self._student_selected()
+        button = _button(self.app, "Registrar Asistencia")
+        if button is not None:
+            self._timed(button.click())
+
+    def open_overview(self):
+        self._goto("Vista General")
+        box = _selectbox(self.app, "Seleccionar Curso")
+        if box is not None:
+            self._timed(box.select_index(self.rng.randrange(len(box.options))))
+
+    def export(self):
+        self._goto("Exportar Datos")
+        button = _button(self.app, "Exportar")
+        if button is not None:
+            self._timed(button.click())
+
+    def close(self):
+        if 'export_dir' in self.app.session_state:
+            shutil.rmtree(self.app.session_state['export_dir'], ignore_errors=True)
+
+def _pick(rng):
+    return rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+
+def _sample_connections(engine, stop, samples):
+    while not stop.is_set():
+        samples.append(engine.pool.checkedout())
+        time.sleep(0.01)
+
+def run_level(users_count, actions, seed):
+    """Corre ``users_count`` usuarios en paralelo con ``actions`` acciones cada uno."""
+    import data_manager
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    users = [User(random.Random(seed + i)) for i in range(users_count)]
+    barrier = threading.Barrier(users_count)
+    failures = []
+
+    def simulate(user):
+        try:
+            barrier.wait()
+            user.start()
+            for _ in range(actions):
+                getattr(user, _pick(user.rng))()
+        except Exception as e:
+            failures.append(repr(e))
+
+    engine = data_manager.get_engine()
+    stop, connections = threading.Event(), []
+    sampler = threading.Thread(target=_sample_connections, args=(engine, stop, connections), daemon=True)
+    sampler.start()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=simulate, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    latencies = [latency for user in users for latency in user.latencies]
+    for user in users:
+        user.close()
+
+    return {
+        'users': users_count,
+        'reruns': len(latencies),
+        'reruns_per_second': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'max_ms': round(max(latencies) * 1000, 1),
+        'db_connections_peak': max(connections, default=0),
+        'db_connections_mean': round(sum(connections) / len(connections), 2) if connections else 0,
+        'memory_per_session_kb': round(memory / users_count / 1024, 1),
+        'errors': sum(user.errors for user in users) + len(failures)
+    }
+
+def compare(report, baseline_path, max_regression):
+    """Compara p95 por nivel contra un JSON anterior. Devuelve False si algún nivel empeora más de la cuenta."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {level['users']: level for level in baseline['levels']}
+    print(f"Comparación contra {baseline.get('revision')} ({baseline_path}):")
+    ok = True
+    for level in report['levels']:
+        before = previous.get(level['users'])
+        if not before:
+            continue
+        ratio = level['p95_ms'] / before['p95_ms'] if before['p95_ms'] else float('inf')
+        regressed = max_regression is not None and ratio > max_regression
+        ok = ok and not regressed
+        print(f"{level['users']:4} usuarios  p95 x{ratio:5.2f}  conexiones {before['db_connections_peak']} -> "
+              f"{level['db_connections_peak']}{'  REGRESIÓN' if regressed else ''}")
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de la app con sesiones simultáneas")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8], help="usuarios simultáneos")
+    parser.add_argument('--actions', type=int, default=20, help="acciones por usuario")
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--students', type=int, default=30, help="alumnos por curso")
+    parser.add_argument('--years', type=int, default=1)
+    parser.add_argument('--url', help="base de datos vacía a usar (por defecto, SQLite temporal)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="archivo JSON de resultados")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--max-regression', type=float,
+                        help="con --compare, falla si el p95 de algún nivel crece más que este factor")
+    args = parser.parse_args(argv)
+
+    path = None
+    url = args.url
+    if not url:
+        fd, path = tempfile.mkstemp(suffix='.db', prefix='load_')
+        os.close(fd)
+        url = f'sqlite:///{path}'
+    engine = create_engine(url)
+    rows = generate_school(engine, args.courses, args.students, args.years, seed=args.seed)
+    engine.dispose()
+    print(f"Escuela generada: {rows}")
+
+    os.environ['DATABASE_URL'] = url
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import data_manager
+
+    try:
+        # Una sesión previa carga los módulos de la app para no contarlos como memoria del primer nivel.
+        warmup = User(random.Random(args.seed))
+        warmup.start()
+        warmup.switch_student()
+        warmup.open_overview()
+        warmup.close()
+        del warmup
+
+        levels = []
+        for users in args.levels:
+            data_manager._read_cache.clear()
+            result = run_level(users, args.actions, args.seed)
+            levels.append(result)
+            print(f"{users:4} usuarios  p50={result['p50_ms']:8.1f}ms p95={result['p95_ms']:8.1f}ms "
+                  f"p99={result['p99_ms']:8.1f}ms reruns/s={result['reruns_per_second']:6.2f} "
+                  f"conexiones={result['db_connections_peak']:3} mem/sesión={result['memory_per_session_kb']:8.1f}KB "
+                  f"errores={result['errors']}")
+
+        report = {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'config': vars(args),
+            'rows': rows,
+            'levels': levels
+        }
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Resultados guardados en {args.output}")
+        ok = not any(level['errors'] for level in levels)
+        if args.compare:
+            ok = compare(report, args.compare, args.max_regression) and ok
+        return ok
+    finally:
+        data_manager.dispose_engine()
+        if path:
+            os.remove(path)
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+import instrumentation
+from data_manager import DataManager
+from benchmarks.generator import generate_school
+
+def make_engine(db):
+    if db == 'memory':
+        return create_engine(
+            'sqlite://',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool
+        ), None
+    fd, path = tempfile.mkstemp(suffix='.db', prefix='bench_')
+    os.close(fd)
+    return create_engine(f'sqlite:///{path}'), path
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def measure(manager, operation, iterations):
+    latencies, queries = [], []
+    tracemalloc.start()
+    for i in range(iterations):
+        manager.cache.clear()
+        with instrumentation.track('benchmark', log=False) as stats:
+            start = time.perf_counter()
+            operation(i)
+            elapsed = time.perf_counter() - start
+        latencies.append(elapsed * 1000)
+        queries.append(stats.query_count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'iterations': iterations,
+        'queries_per_call': statistics.mean(queries),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'max_ms': round(max(latencies), 3),
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+
+def build_cases(manager, courses, students_per_course, rng):
+    course_names = [f"Curso {c + 1:03d}" for c in range(courses)]
+    total_students = courses * students_per_course
+    today = date.today().strftime('%Y-%m-%d')
+    last_month = date.today() - timedelta(days=30)
+
+    def any_course(i):
+        return rng.choice(course_names)
+
+    def any_student(i):
+        return rng.randint(1, total_students)
+
+    def bulk_attendance(i):
+        course = any_course(i)
+        statuses = {student_id: 'Presente' for student_id, _ in manager.get_students(course)}
+        manager.cache.clear()
+        manager.add_attendance_bulk(course, today, statuses)
+
+    return {
+        'get_courses': lambda i: manager.get_courses(),
+        'get_students': lambda i: manager.get_students(any_course(i)),
+        'get_student_data': lambda i: manager.get_student_data(any_student(i)),
+        'get_student_data_30d': lambda i: manager.get_student_data(any_student(i), last_month, None),
+        'get_notes': lambda i: manager.get_notes(any_student(i)),
+        'get_course_summary': lambda i: manager.get_course_summary(any_course(i)),
+        'export_to_csv': lambda i: manager.export_to_csv(any_course(i)),
+        'add_course': lambda i: manager.add_course(f"Bench {i} {rng.random()}"),
+        'add_student': lambda i: manager.add_student(any_course(i), {'nombre': 'Bench', 'apellido': f"Alumno {i}"}),
+        'add_attendance': lambda i: manager.add_attendance(any_student(i), 'Presente', today),
+        'add_attendance_bulk': bulk_attendance,
+        'add_behavior_note': lambda i: manager.add_behavior_note(any_student(i), 8, 'benchmark'),
+        'add_assignment': lambda i: manager.add_assignment(any_student(i), 'Benchmark', 'Entregado', today),
+        'add_note': lambda i: manager.add_note(any_student(i), 'benchmark')
+    }
+
+def compare(report, baseline_path):
+    """Imprime la variación de p50 y de consultas contra un JSON anterior."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"Comparación contra {baseline.get('revision')} ({baseline_path}):")
+    for name, result in report['results'].items():
+        previous = baseline['results'].get(name)
+        if not previous:
+            continue
+        ratio = result['p50_ms'] / previous['p50_ms'] if previous['p50_ms'] else float('inf')
+        print(f"{name:24} p50 x{ratio:5.2f}  queries {previous['queries_per_call']:.1f} -> {result['queries_per_call']:.1f}")
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de DataManager sobre SQLite")
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--students', type=int, default=30, help="alumnos por curso")
+    parser.add_argument('--years', type=int, default=1)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--db', choices=['memory', 'file'], default='memory')
+    parser.add_argument('--only', nargs='*', help="ejecutar solo estos casos")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="archivo JSON de resultados")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args(argv)
+
+    engine, path = make_engine(args.db)
+    try:
+        start = time.perf_counter()
+        rows = generate_school(engine, args.courses, args.students, args.years, seed=args.seed)
+        generation_s = time.perf_counter() - start
+        print(f"Escuela generada en {generation_s:.1f}s: {rows}")
+
+        manager = DataManager(engine)
+        cases = build_cases(manager, args.courses, args.students, random.Random(args.seed))
+
+        results = {}
+        for name, operation in cases.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = measure(manager, operation, args.iterations)
+            r = results[name]
+            print(f"{name:24} p50={r['p50_ms']:9.3f}ms p95={r['p95_ms']:9.3f}ms "
+                  f"queries={r['queries_per_call']:6.1f} peak={r['peak_memory_kb']:9.1f}KB")
+
+        report = {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'config': vars(args),
+            'rows': rows,
+            'generation_s': round(generation_s, 3),
+            'results': results
+        }
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Resultados guardados en {args.output}")
+        if args.compare:
+            compare(report, args.compare)
+        return report
+    finally:
+        engine.dispose()
+        if path:
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Tiempo de importación y de primer render de la app, cada muestra en un proceso nuevo.
+
+Uso (desde EstudianteControl/):
+
+    python -m benchmarks.startup --samples 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+
+from data_manager import migrate
+from benchmarks.run import git_revision
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_TARGETS = {
+    'data_manager': 'import data_manager',
+    'components': 'import components',
+    'main_dependencies': 'import streamlit, instrumentation, data_manager, components'
+}
+HEAVY_MODULES = ['pandas', 'numpy', 'plotly.express', 'sqlalchemy']
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+RENDER_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({main!r}, default_timeout=120)
+app.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - start
+print(json.dumps({{'first_render': first, 'rerun': rerun, 'exceptions': len(app.exception)}}))
+"""
+
+def _sample(script, env):
+    output = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def _summary(values):
+    return {
+        'median_ms': round(statistics.median(values) * 1000, 1),
+        'min_ms': round(min(values) * 1000, 1),
+        'max_ms': round(max(values) * 1000, 1)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de la app")
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--skip-render', action='store_true', help="medir solo importaciones")
+    parser.add_argument('--output', help="archivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    fd, db_path = tempfile.mkstemp(suffix='.db', prefix='startup_')
+    os.close(fd)
+    engine = create_engine(f'sqlite:///{db_path}')
+    migrate(engine)
+    engine.dispose()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', LOG_LEVEL='WARNING')
+
+    report = {'revision': git_revision(), 'samples': args.samples, 'imports': {}}
+    try:
+        for name, statement in IMPORT_TARGETS.items():
+            script = IMPORT_SCRIPT.format(statement=statement, heavy=HEAVY_MODULES)
+            samples = [_sample(script, env) for _ in range(args.samples)]
+            report['imports'][name] = dict(
+                _summary([s['seconds'] for s in samples]),
+                loaded=samples[-1]['loaded']
+            )
+            print(f"import {name:20} {report['imports'][name]['median_ms']:8.1f}ms  carga: {samples[-1]['loaded']}")
+
+        if not args.skip_render:
+            script = RENDER_SCRIPT.format(main=os.path.join(APP_DIR, 'main.py'))
+            samples = [_sample(script, env) for _ in range(args.samples)]
+            report['first_render'] = _summary([s['first_render'] for s in samples])
+            report['rerun'] = _summary([s['rerun'] for s in samples])
+            report['exceptions'] = sum(s['exceptions'] for s in samples)
+            print(f"primer render            {report['first_render']['median_ms']:8.1f}ms")
+            print(f"rerun                    {report['rerun']['median_ms']:8.1f}ms")
+    finally:
+        os.remove(db_path)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+    return report
+
+if __name__ == "__main__":
+    main()
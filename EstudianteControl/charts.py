@@ -0,0 +1,34 @@
+"""Definiciones de los gráficos por alumno, compartidas por la app y reports.py.
+
+Cada función recibe el DataFrame que devuelve el método correspondiente de
+DataManager y arma la figura de plotly, sin depender de Streamlit.
+"""
+import plotly.express as px
+
+def attendance_pie(counts):
+    """Torta de asistencia a partir de get_attendance_counts (status, count)."""
+    return px.pie(
+        counts,
+        names='status',
+        values='count',
+        title='Distribución de Asistencia'
+    )
+
+def behavior_line(series):
+    """Evolución de conducta a partir de get_behavior_series (date, score, count)."""
+    return px.line(
+        series,
+        x='date',
+        y='score',
+        markers=True,
+        title='Evolución de Conducta'
+    )
+
+def assignments_bar(counts):
+    """Barras de trabajos por estado a partir de get_assignment_counts (status, count)."""
+    return px.bar(
+        counts,
+        x='status',
+        y='count',
+        title='Estado de Trabajos'
+    )
@@ -1,7 +1,11 @@
+"""Componentes de Streamlit.
+
+pandas, plotly, charts y analytics se importan dentro de cada función para no
+cargarlos hasta que una página los necesita.
+"""
 import streamlit as st
-from datetime import datetime
-import plotly.express as px
-import pandas as pd
+from datetime import datetime, timedelta
+from utils import ATTENDANCE_STATUSES, ASSIGNMENT_STATUSES, MIN_SCORE, MAX_SCORE, HISTORY_WINDOWS, get_history_window
 
 def render_student_form(course):
     st.subheader("Agregar Nuevo Alumno")
@@ -23,63 +27,186 @@ def render_student_form(course):
             else:
                 st.error("Por favor complete todos los campos")
 
-def render_attendance_section(course, student):
+def render_history_window():
+    option = st.selectbox("Período", HISTORY_WINDOWS + ["Personalizado"], key="history_window")
+    if option == "Personalizado":
+        today = datetime.now().date()
+        start_date, end_date = get_history_window("Trimestre actual", today)
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = st.date_input("Desde", start_date, key="history_start")
+        with col2:
+            end_date = st.date_input("Hasta", end_date, key="history_end")
+        return start_date, end_date
+    return get_history_window(option)
+
+def _entry_date(label, key=None):
+    """date_input que no deja elegir días de años lectivos cerrados."""
+    open_from = st.session_state.data_manager.get_open_from()
+    today = datetime.now().date()
+    return st.date_input(label, max(today, open_from) if open_from else today, min_value=open_from, key=key)
+
+def render_attendance_section(student_id, start_date=None, end_date=None):
+    import charts
     st.subheader("Registro de Asistencia")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        date = st.date_input("Fecha", datetime.now())
+        date = _entry_date("Fecha")
         status = st.selectbox(
             "Estado",
-            ["Presente", "Ausente", "Tardanza"]
+            ATTENDANCE_STATUSES
         )
         
         if st.button("Registrar Asistencia"):
-            st.session_state.data_manager.add_attendance(
-                course, student, status, date.strftime('%Y-%m-%d')
-            )
-            st.success("Asistencia registrada")
+            if st.session_state.data_manager.add_attendance(
+                student_id, status, date.strftime('%Y-%m-%d')
+            ):
+                st.success("Asistencia registrada")
+            else:
+                st.error("Error al registrar la asistencia")
     
     with col2:
-        attendance_data = st.session_state.data_manager.get_student_data(course, student)['attendance']
-        if attendance_data:
-            df = pd.DataFrame(attendance_data)
-            fig = px.pie(
-                df,
-                names='status',
-                title='Distribución de Asistencia'
+        counts = st.session_state.data_manager.get_attendance_counts(student_id, start_date, end_date)
+        if not counts.empty:
+            st.plotly_chart(charts.attendance_pie(counts))
+
+def render_roll_call(course):
+    import pandas as pd
+    st.subheader("Tomar Asistencia")
+    
+    roster = st.session_state.data_manager.get_students(course)
+    if not roster:
+        st.info("No hay alumnos en este curso.")
+        return
+    
+    date = _entry_date("Fecha", key="roll_call_date")
+    df = pd.DataFrame({
+        'id': [student_id for student_id, _ in roster],
+        'Alumno': [name for _, name in roster],
+        'Estado': ["Presente"] * len(roster)
+    })
+    edited = st.data_editor(
+        df,
+        column_config={
+            'id': None,
+            'Alumno': st.column_config.TextColumn("Alumno", disabled=True),
+            'Estado': st.column_config.SelectboxColumn(
+                "Estado",
+                options=list(ATTENDANCE_STATUSES),
+                required=True
             )
-            st.plotly_chart(fig)
+        },
+        hide_index=True,
+        key=f"roll_call_{course}"
+    )
+    
+    if st.button("Registrar Asistencia del Curso"):
+        statuses = dict(zip(edited['id'].astype(int).tolist(), edited['Estado']))
+        if st.session_state.data_manager.add_attendance_bulk(
+            course, date.strftime('%Y-%m-%d'), statuses
+        ):
+            st.success(f"Asistencia registrada para {len(statuses)} alumnos")
+        else:
+            st.error("Error al registrar la asistencia")
+
+QUICK_ENTRY_TYPES = {
+    "Asistencia": "add_attendance",
+    "Conducta": "add_behavior_note",
+    "Trabajo": "add_assignment",
+    "Nota": "add_note"
+}
 
-def render_behavior_section(course, student):
+def render_quick_entry(course):
+    import pandas as pd
+    st.subheader("Carga Rápida")
+    st.caption("Cargue varios registros y guárdelos juntos. Conducta usa Calificación y Texto; "
+               "Trabajo usa Texto como título y Estado; Nota usa Texto.")
+    
+    students = dict(st.session_state.data_manager.get_students(course))
+    if not students:
+        st.info("No hay alumnos en este curso.")
+        return
+    
+    names = {name: student_id for student_id, name in students.items()}
+    empty = pd.DataFrame({
+        'Alumno': pd.Series(dtype='object'),
+        'Tipo': pd.Series(dtype='object'),
+        'Fecha': pd.Series(dtype='object'),
+        'Estado': pd.Series(dtype='object'),
+        'Calificación': pd.Series(dtype='Int64'),
+        'Texto': pd.Series(dtype='object')
+    })
+    edited = st.data_editor(
+        empty,
+        num_rows="dynamic",
+        column_config={
+            'Alumno': st.column_config.SelectboxColumn("Alumno", options=list(names), required=True),
+            'Tipo': st.column_config.SelectboxColumn("Tipo", options=list(QUICK_ENTRY_TYPES), required=True),
+            'Fecha': st.column_config.DateColumn(
+                "Fecha", default=datetime.now().date(), min_value=st.session_state.data_manager.get_open_from()
+            ),
+            'Estado': st.column_config.SelectboxColumn(
+                "Estado", options=[*ATTENDANCE_STATUSES, *ASSIGNMENT_STATUSES]
+            ),
+            'Calificación': st.column_config.NumberColumn("Calificación", min_value=MIN_SCORE, max_value=MAX_SCORE, step=1),
+            'Texto': st.column_config.TextColumn("Texto")
+        },
+        hide_index=True,
+        key=f"quick_entry_{course}"
+    )
+    
+    if st.button("Guardar Todo") and not edited.empty:
+        with st.session_state.data_manager.batch() as batch:
+            for row in edited.itertuples(index=False):
+                student_id = names.get(row.Alumno)
+                date = row.Fecha.strftime('%Y-%m-%d') if pd.notna(row.Fecha) else None
+                operation = QUICK_ENTRY_TYPES.get(row.Tipo)
+                if operation == "add_attendance":
+                    batch.add_attendance(student_id, row.Estado, date)
+                elif operation == "add_behavior_note":
+                    batch.add_behavior_note(student_id, row.Calificación, row.Texto, date)
+                elif operation == "add_assignment":
+                    batch.add_assignment(student_id, row.Texto, row.Estado, date)
+                else:
+                    batch.add_note(student_id, row.Texto, date)
+        
+        report = edited[['Alumno', 'Tipo']].assign(
+            Resultado=["Guardado" if r['ok'] else f"Error: {r['error']}" for r in batch.results]
+        )
+        saved = sum(r['ok'] for r in batch.results)
+        if saved == len(batch.results):
+            st.success(f"{saved} registros guardados")
+        else:
+            st.warning(f"{saved} de {len(batch.results)} registros guardados")
+        st.dataframe(report, hide_index=True)
+
+def render_behavior_section(student_id, start_date=None, end_date=None):
+    import charts
     st.subheader("Notas de Conducta")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        score = st.slider("Calificación", 1, 10, 7)
+        score = st.slider("Calificación", MIN_SCORE, MAX_SCORE, 7)
         description = st.text_area("Descripción")
         
         if st.button("Registrar Nota de Conducta"):
-            st.session_state.data_manager.add_behavior_note(
-                course, student, score, description
-            )
-            st.success("Nota de conducta registrada")
+            if st.session_state.data_manager.add_behavior_note(
+                student_id, score, description
+            ):
+                st.success("Nota de conducta registrada")
+            else:
+                st.error("Error al registrar la nota de conducta")
     
     with col2:
-        behavior_data = st.session_state.data_manager.get_student_data(course, student)['behavior']
-        if behavior_data:
-            df = pd.DataFrame(behavior_data)
-            fig = px.line(
-                df,
-                x='date',
-                y='score',
-                title='Evolución de Conducta'
-            )
-            st.plotly_chart(fig)
+        series = st.session_state.data_manager.get_behavior_series(student_id, start_date, end_date)
+        if not series.empty:
+            st.plotly_chart(charts.behavior_line(series))
 
-def render_assignments_section(course, student):
+def render_assignments_section(student_id, start_date=None, end_date=None):
+    import charts
     st.subheader("Trabajos")
     
     col1, col2 = st.columns([2, 1])
@@ -88,60 +215,55 @@ def render_assignments_section(course, student):
         title = st.text_input("Título del Trabajo")
         status = st.selectbox(
             "Estado",
-            ["Entregado", "Pendiente", "Atrasado"]
+            ASSIGNMENT_STATUSES
         )
-        date = st.date_input("Fecha de Entrega", datetime.now())
+        date = _entry_date("Fecha de Entrega")
         
         if st.button("Registrar Trabajo"):
-            st.session_state.data_manager.add_assignment(
-                course, student, title, status, date.strftime('%Y-%m-%d')
-            )
-            st.success("Trabajo registrado")
+            if st.session_state.data_manager.add_assignment(
+                student_id, title, status, date.strftime('%Y-%m-%d')
+            ):
+                st.success("Trabajo registrado")
+            else:
+                st.error("Error al registrar el trabajo")
     
     with col2:
-        assignments_data = st.session_state.data_manager.get_student_data(course, student)['assignments']
-        if assignments_data:
-            df = pd.DataFrame(assignments_data)
-            fig = px.bar(
-                df,
-                x='status',
-                title='Estado de Trabajos'
-            )
-            st.plotly_chart(fig)
+        counts = st.session_state.data_manager.get_assignment_counts(student_id, start_date, end_date)
+        if not counts.empty:
+            st.plotly_chart(charts.assignments_bar(counts))
 
-def render_notes_section(course, student):
+def render_notes_section(student_id):
     st.subheader("Notas y Descargos")
     
     note = st.text_area("Nueva Nota")
+    pages_key = f"notes_cursors_{student_id}"
     if st.button("Agregar Nota"):
-        st.session_state.data_manager.add_note(course, student, note)
-        st.success("Nota agregada")
+        if st.session_state.data_manager.add_note(student_id, note):
+            st.session_state[pages_key] = [None]
+            st.success("Nota agregada")
+        else:
+            st.error("Error al agregar la nota")
     
-    notes_data = st.session_state.data_manager.get_student_data(course, student)['notes']
-    if notes_data:
+    if pages_key not in st.session_state:
+        st.session_state[pages_key] = [None]
+    
+    cursor = None
+    for before in st.session_state[pages_key]:
+        notes_data, cursor = st.session_state.data_manager.get_notes(student_id, before=before)
         for note in notes_data:
             st.text(f"{note['date']}: {note['note']}")
+    
+    if cursor is not None and st.button("Ver notas anteriores"):
+        st.session_state[pages_key].append(cursor)
+        st.rerun()
 
 def render_class_overview(course):
-    students_data = []
-    
-    for student in st.session_state.data_manager.get_students(course):
-        data = st.session_state.data_manager.get_student_data(course, student)
-        
-        attendance_rate = sum(1 for a in data['attendance'] if a['status'] == 'Presente') / len(data['attendance']) if data['attendance'] else 0
-        behavior_avg = sum(b['score'] for b in data['behavior']) / len(data['behavior']) if data['behavior'] else 0
-        assignments_completed = sum(1 for a in data['assignments'] if a['status'] == 'Entregado')
-        
-        students_data.append({
-            'Alumno': student,
-            'Asistencia (%)': round(attendance_rate * 100, 2),
-            'Promedio Conducta': round(behavior_avg, 2),
-            'Trabajos Entregados': assignments_completed,
-            'Total Trabajos': len(data['assignments'])
-        })
-    
-    if students_data:
-        df = pd.DataFrame(students_data)
+    df = st.session_state.data_manager.get_course_summary(course)
+    render_course_summary(course, df)
+
+def render_course_summary(course, df, trends=True):
+    import plotly.express as px
+    if not df.empty:
         st.dataframe(df)
         
         col1, col2 = st.columns(2)
@@ -163,3 +285,128 @@ def render_class_overview(course):
                 title='Promedio de Conducta por Alumno'
             )
             st.plotly_chart(fig)
+        
+        if trends and st.checkbox("Mostrar tendencias (últimos 90 días)"):
+            render_course_trends(course)
+
+def render_school_dashboard():
+    import plotly.express as px
+    import analytics
+    manager = st.session_state.data_manager
+    years = manager.get_school_years()
+    year = st.selectbox("Año lectivo", options=[None] + years,
+                        format_func=lambda y: "En curso" if y is None else str(y)) if years else None
+    summary = manager.get_school_summary() if year is None else manager.get_year_summary(year)
+    if summary.empty:
+        st.info("No hay alumnos cargados.")
+        return
+    
+    overview = analytics.course_overview(summary)
+    st.dataframe(overview, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fig = px.bar(
+            overview,
+            x='Curso',
+            y='Asistencia (%)',
+            title='Asistencia por Curso'
+        )
+        st.plotly_chart(fig)
+    
+    with col2:
+        fig = px.bar(
+            overview,
+            x='Curso',
+            y='Promedio Conducta',
+            title='Promedio de Conducta por Curso'
+        )
+        st.plotly_chart(fig)
+    
+    course = st.selectbox("Ver detalle del curso", options=[None] + list(overview['Curso']),
+                          format_func=lambda name: "-" if name is None else name)
+    if course:
+        course_df = summary[summary['Curso'] == course].drop(columns=['Curso']).reset_index(drop=True)
+        render_course_summary(course, course_df, trends=year is None)
+
+def render_course_trends(course):
+    import plotly.express as px
+    import analytics
+    start_date = datetime.now().date() - timedelta(days=90)
+    frames = st.session_state.data_manager.get_history_frames(course, start_date)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if not frames['attendance'].empty:
+            trend = analytics.rolling_attendance_rate(frames['attendance'], '28D', by='course_id')
+            fig = px.line(
+                trend,
+                x='date',
+                y='attendance_rate',
+                title='Asistencia del Curso (ventana de 4 semanas)'
+            )
+            st.plotly_chart(fig)
+    
+    with col2:
+        if not frames['behavior'].empty:
+            trend = analytics.behavior_moving_average(frames['behavior'], 4, by='course_id')
+            fig = px.line(
+                trend,
+                x='date',
+                y='behavior_ma',
+                title='Conducta del Curso (promedio móvil)'
+            )
+            st.plotly_chart(fig)
+
+def render_search(courses):
+    import pandas as pd
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input("Buscar en notas y conducta", placeholder="p. ej. bullying")
+    with col2:
+        course = st.selectbox("Curso", options=[None] + courses,
+                              format_func=lambda name: "Todos" if name is None else name)
+    
+    if (query, course) != st.session_state.get('search_key'):
+        st.session_state.search_key = (query, course)
+        st.session_state.search_page = 0
+    
+    if not query:
+        return
+    
+    page = st.session_state.search_page
+    results, has_more = st.session_state.data_manager.search_notes(query, course=course, page=page)
+    if not results:
+        st.info("Sin resultados.")
+        return
+    
+    st.dataframe(pd.DataFrame(results).drop(columns=['student_id']), hide_index=True)
+    
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if page > 0 and st.button("Anterior"):
+            st.session_state.search_page -= 1
+            st.rerun()
+    with col2:
+        if has_more and st.button("Siguiente"):
+            st.session_state.search_page += 1
+            st.rerun()
+    with col3:
+        st.caption(f"Página {page + 1}")
+
+def render_performance_panel(stats):
+    import pandas as pd
+    with st.sidebar.expander("Rendimiento (admin)"):
+        summary = stats.as_dict()
+        st.metric("Consultas", summary['queries'])
+        st.metric("Tiempo en BD (ms)", summary['db_ms'])
+        st.metric("Tiempo total (ms)", summary['elapsed_ms'])
+        if summary['methods']:
+            st.dataframe(pd.DataFrame([
+                {'Método': name, **values} for name, values in summary['methods'].items()
+            ]))
+        for slow in summary['slowest']:
+            st.code(f"{slow['ms']} ms  {slow['statement']}", language="sql")
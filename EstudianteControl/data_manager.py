@@ -1,11 +1,18 @@
-import pandas as pd
-from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, ForeignKey, Text, event
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.pool import QueuePool
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, literal, text, Table, Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, Index, func, case, select, insert, delete, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+import logging
 import os
-import urllib.parse
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import instrumentation
+from utils import ATTENDANCE_STATUSES, ASSIGNMENT_STATUSES, MIN_SCORE, MAX_SCORE, school_year_of, school_year_range
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
@@ -26,6 +33,11 @@ class Student(Base):
     behaviors = relationship("Behavior", back_populates="student", cascade="all, delete-orphan")
     assignments = relationship("Assignment", back_populates="student", cascade="all, delete-orphan")
     notes = relationship("Note", back_populates="student", cascade="all, delete-orphan")
+    stats = relationship("StudentStats", back_populates="student", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index('ix_students_course_name', 'course_id', 'last_name', 'first_name'),
+    )
 
 class Attendance(Base):
     __tablename__ = 'attendances'
@@ -35,6 +47,11 @@ class Attendance(Base):
     student_id = Column(Integer, ForeignKey('students.id'))
     student = relationship("Student", back_populates="attendances")
 
+    __table_args__ = (
+        Index('ix_attendances_student_date', 'student_id', 'date'),
+        {'sqlite_autoincrement': True}
+    )
+
 class Behavior(Base):
     __tablename__ = 'behaviors'
     id = Column(Integer, primary_key=True)
@@ -44,6 +61,11 @@ class Behavior(Base):
     student_id = Column(Integer, ForeignKey('students.id'))
     student = relationship("Student", back_populates="behaviors")
 
+    __table_args__ = (
+        Index('ix_behaviors_student_date', 'student_id', 'date'),
+        {'sqlite_autoincrement': True}
+    )
+
 class Assignment(Base):
     __tablename__ = 'assignments'
     id = Column(Integer, primary_key=True)
@@ -53,6 +75,11 @@ class Assignment(Base):
     student_id = Column(Integer, ForeignKey('students.id'))
     student = relationship("Student", back_populates="assignments")
 
+    __table_args__ = (
+        Index('ix_assignments_student_date', 'student_id', 'date'),
+        {'sqlite_autoincrement': True}
+    )
+
 class Note(Base):
     __tablename__ = 'notes'
     id = Column(Integer, primary_key=True)
@@ -61,204 +88,1258 @@ class Note(Base):
     student_id = Column(Integer, ForeignKey('students.id'))
     student = relationship("Student", back_populates="notes")
 
-class DataManager:
-    def __init__(self):
-        database_url = os.getenv('DATABASE_URL')
-        if not database_url:
-            raise ValueError("DATABASE_URL environment variable not found")
+    __table_args__ = (
+        Index('ix_notes_student_date', 'student_id', 'date'),
+        {'sqlite_autoincrement': True}
+    )
 
-        try:
-            print(f"Inicializando conexión a la base de datos...")
-            # Usar directamente la URL de la base de datos proporcionada por Replit
-            self.engine = create_engine(
-                database_url,
-                echo=True,
-                pool_size=5,
-                max_overflow=10,
-                pool_timeout=30,
+class StudentStats(Base):
+    """Totales por alumno mantenidos en la misma transacción que cada alta de historial."""
+    __tablename__ = 'student_stats'
+    student_id = Column(Integer, ForeignKey('students.id'), primary_key=True)
+    attendance_total = Column(Integer, nullable=False, default=0)
+    attendance_present = Column(Integer, nullable=False, default=0)
+    behavior_count = Column(Integer, nullable=False, default=0)
+    behavior_sum = Column(Integer, nullable=False, default=0)
+    assignments_total = Column(Integer, nullable=False, default=0)
+    assignments_delivered = Column(Integer, nullable=False, default=0)
+    student = relationship("Student", back_populates="stats")
+
+class ImportProgress(Base):
+    """Filas ya confirmadas de cada archivo importado, para poder reanudar."""
+    __tablename__ = 'import_progress'
+    source = Column(String(255), primary_key=True)
+    kind = Column(String(20), primary_key=True)
+    rows_committed = Column(Integer, nullable=False, default=0)
+
+class Alert(Base):
+    """Alerta de alumno en riesgo calculada por el proceso de alerts.py."""
+    __tablename__ = 'alerts'
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey('students.id'), nullable=False)
+    kind = Column(String(20), nullable=False)
+    value = Column(Float, nullable=False)
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    notified_at = Column(DateTime)
+    active = Column(Boolean, nullable=False, default=True)
+
+    __table_args__ = (
+        Index('ix_alerts_active_student', 'active', 'student_id'),
+    )
+
+class AlertWatermark(Base):
+    """Último id de cada tabla de historial ya evaluado por el proceso de alertas."""
+    __tablename__ = 'alert_watermarks'
+    table_name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False)
+
+class SchoolYear(Base):
+    """Año lectivo cerrado: su historial pasó a las tablas *_archive y es de solo lectura."""
+    __tablename__ = 'school_years'
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    closed_at = Column(DateTime, nullable=False)
+
+class StudentYearStats(Base):
+    """Totales por alumno de un año lectivo cerrado, guardados al cerrarlo."""
+    __tablename__ = 'student_year_stats'
+    student_id = Column(Integer, ForeignKey('students.id'), primary_key=True)
+    school_year = Column(Integer, primary_key=True, autoincrement=False)
+    attendance_total = Column(Integer, nullable=False, default=0)
+    attendance_present = Column(Integer, nullable=False, default=0)
+    behavior_count = Column(Integer, nullable=False, default=0)
+    behavior_sum = Column(Integer, nullable=False, default=0)
+    assignments_total = Column(Integer, nullable=False, default=0)
+    assignments_delivered = Column(Integer, nullable=False, default=0)
+
+HISTORY_MODELS = (Attendance, Behavior, Assignment, Note)
+
+def _archive_table(model):
+    """Tabla con las mismas columnas que ``model`` para el historial de años cerrados.
+
+    En PostgreSQL es una tabla particionada por rango de ``date`` con una
+    partición por año lectivo (la clave primaria incluye ``date`` porque
+    así lo exige el particionado); en SQLite es una tabla común.
+    """
+    columns = [
+        Column(column.name, column.type, nullable=column.nullable, autoincrement=False,
+               primary_key=column.primary_key or column.name == 'date')
+        for column in model.__table__.columns
+    ]
+    return Table(
+        f'{model.__tablename__}_archive', Base.metadata, *columns,
+        Index(f'ix_{model.__tablename__}_archive_student_date', 'student_id', 'date'),
+        postgresql_partition_by='RANGE (date)'
+    )
+
+ARCHIVE_TABLES = {model: _archive_table(model) for model in HISTORY_MODELS}
+
+def _stats_select(student_ids=None, start=None, end=None):
+    attendance = select(
+        Attendance.student_id,
+        func.count(Attendance.id).label('total'),
+        func.sum(case((Attendance.status == 'Presente', 1), else_=0)).label('present')
+    ).group_by(Attendance.student_id)
+    behavior = select(
+        Behavior.student_id,
+        func.count(Behavior.id).label('count'),
+        func.sum(Behavior.score).label('total')
+    ).group_by(Behavior.student_id)
+    assignments = select(
+        Assignment.student_id,
+        func.count(Assignment.id).label('total'),
+        func.sum(case((Assignment.status == 'Entregado', 1), else_=0)).label('delivered')
+    ).group_by(Assignment.student_id)
+    query = select(Student.id)
+
+    if start is not None:
+        attendance = attendance.where(Attendance.date >= start)
+        behavior = behavior.where(Behavior.date >= start)
+        assignments = assignments.where(Assignment.date >= start)
+    if end is not None:
+        attendance = attendance.where(Attendance.date < end)
+        behavior = behavior.where(Behavior.date < end)
+        assignments = assignments.where(Assignment.date < end)
+
+    if student_ids is not None:
+        attendance = attendance.where(Attendance.student_id.in_(student_ids))
+        behavior = behavior.where(Behavior.student_id.in_(student_ids))
+        assignments = assignments.where(Assignment.student_id.in_(student_ids))
+        query = query.where(Student.id.in_(student_ids))
+
+    attendance = attendance.subquery()
+    behavior = behavior.subquery()
+    assignments = assignments.subquery()
+    return (
+        query.add_columns(
+            func.coalesce(attendance.c.total, 0),
+            func.coalesce(attendance.c.present, 0),
+            func.coalesce(behavior.c.count, 0),
+            func.coalesce(behavior.c.total, 0),
+            func.coalesce(assignments.c.total, 0),
+            func.coalesce(assignments.c.delivered, 0)
+        )
+        .outerjoin(attendance, attendance.c.student_id == Student.id)
+        .outerjoin(behavior, behavior.c.student_id == Student.id)
+        .outerjoin(assignments, assignments.c.student_id == Student.id)
+    )
+
+def refresh_stats(connection, student_ids=None):
+    """Recalcula student_stats desde las tablas de historial.
+
+    ``connection`` puede ser una Session o una Connection; no hace commit.
+    Sin ``student_ids`` recalcula todos los alumnos.
+    """
+    delete_stmt = delete(StudentStats)
+    if student_ids is not None:
+        delete_stmt = delete_stmt.where(StudentStats.student_id.in_(student_ids))
+    connection.execute(delete_stmt)
+    connection.execute(
+        insert(StudentStats).from_select(
+            ['student_id', 'attendance_total', 'attendance_present', 'behavior_count',
+             'behavior_sum', 'assignments_total', 'assignments_delivered'],
+            _stats_select(student_ids)
+        )
+    )
+
+SUMMARY_COLUMNS = ['Curso', 'Alumno', 'Asistencia (%)', 'Promedio Conducta', 'Trabajos Entregados', 'Total Trabajos']
+
+def summary_select(courses=None, school_year=None):
+    """Consulta del resumen por alumno (student_stats) de ``courses``, o de toda la escuela.
+
+    Con ``school_year`` lee los totales guardados al cerrar ese año lectivo.
+    """
+    stats = StudentStats if school_year is None else StudentYearStats
+    query = (
+        select(
+            Course.name,
+            Student.last_name,
+            Student.first_name,
+            func.coalesce(stats.attendance_total, 0),
+            func.coalesce(stats.attendance_present, 0),
+            func.coalesce(stats.behavior_count, 0),
+            func.coalesce(stats.behavior_sum, 0),
+            func.coalesce(stats.assignments_delivered, 0),
+            func.coalesce(stats.assignments_total, 0)
+        )
+        .join(Course, Student.course_id == Course.id)
+        .order_by(Course.name, Student.id)
+    )
+    if school_year is None:
+        query = query.outerjoin(StudentStats, StudentStats.student_id == Student.id)
+    else:
+        query = query.join(StudentYearStats, (StudentYearStats.student_id == Student.id)
+                           & (StudentYearStats.school_year == school_year))
+    if courses is not None:
+        query = query.where(Course.name.in_(courses))
+    return query
+
+def summary_record(row):
+    """Convierte una fila de summary_select en un registro con SUMMARY_COLUMNS."""
+    course, last_name, first_name, attendance_total, present, behavior_count, behavior_sum, delivered, assignments_total = row
+    attendance_rate = present / attendance_total if attendance_total else 0
+    behavior_avg = behavior_sum / behavior_count if behavior_count else 0
+    return {
+        'Curso': course,
+        'Alumno': f"{last_name}, {first_name}",
+        'Asistencia (%)': round(attendance_rate * 100, 2),
+        'Promedio Conducta': round(behavior_avg, 2),
+        'Trabajos Entregados': delivered,
+        'Total Trabajos': assignments_total
+    }
+
+def _period_start(column, period, dialect):
+    """Expresión SQL con el primer día del período (día, semana o mes) de ``column``."""
+    if period == 'day':
+        return column
+    if dialect == 'postgresql':
+        return func.date(func.date_trunc(period, column))
+    if period == 'week':
+        return func.date(column, 'weekday 0', '-6 days')
+    return func.date(column, 'start of month')
+
+def open_from(connection):
+    """Primer día del primer año lectivo abierto, o None si nunca se cerró uno."""
+    return connection.execute(select(func.max(SchoolYear.end_date))).scalar()
+
+def close_school_year(connection, year, today=None):
+    """Cierra el año lectivo ``year`` y los anteriores que sigan abiertos.
+
+    Por cada año guarda los totales por alumno en student_year_stats, mueve
+    su historial de las tablas activas a las *_archive y recalcula
+    student_stats, que queda con los años abiertos solamente. Así las
+    tablas activas (y sus índices) no crecen de un año a otro. No hace
+    commit. Devuelve las filas archivadas por tabla.
+    """
+    today = today or datetime.now().date()
+    end = school_year_range(year)[1]
+    if end > today:
+        raise ValueError(f"El año lectivo {year} todavía no terminó")
+    closed_until = open_from(connection)
+    if closed_until is not None and end <= closed_until:
+        raise ValueError(f"El año lectivo {year} ya está cerrado")
+
+    oldest = [connection.execute(select(func.min(model.date))).scalar() for model in HISTORY_MODELS]
+    first_year = school_year_of(min([d for d in oldest if d is not None], default=end - timedelta(days=1)))
+    closed = set(connection.execute(select(SchoolYear.year)).scalars())
+    now = datetime.now()
+
+    for closing in range(first_year, year + 1):
+        start, stop = school_year_range(closing)
+        if connection.dialect.name == 'postgresql':
+            for table in ARCHIVE_TABLES.values():
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {table.name}_{closing} PARTITION OF {table.name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{stop.isoformat()}')"
+                ))
+        if closing in closed:
+            continue
+
+        rollups = [
+            dict(zip(['student_id', 'attendance_total', 'attendance_present', 'behavior_count',
+                      'behavior_sum', 'assignments_total', 'assignments_delivered'], row), school_year=closing)
+            for row in connection.execute(_stats_select(start=start, end=stop))
+            if row[1] or row[3] or row[5]
+        ]
+        if rollups:
+            connection.execute(insert(StudentYearStats), rollups)
+        connection.execute(insert(SchoolYear).values(year=closing, start_date=start, end_date=stop, closed_at=now))
+
+    archived = {}
+    for model, table in ARCHIVE_TABLES.items():
+        columns = [column.name for column in table.columns]
+        connection.execute(table.insert().from_select(
+            columns, select(*[model.__table__.c[name] for name in columns]).where(model.date < end)
+        ))
+        archived[model.__tablename__] = connection.execute(delete(model).where(model.date < end)).rowcount
+    refresh_stats(connection)
+    logger.info("Año lectivo %s cerrado: %s", year, archived)
+    return archived
+
+class LRUCache:
+    """Caché LRU acotada y segura entre hilos para las lecturas de DataManager."""
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            value, expires = self._data[key]
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl=None):
+        """Guarda ``value``; con ``ttl`` (segundos) la entrada vence sola."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_prefix(self, prefix):
+        """Elimina todas las entradas cuya clave empieza con ``prefix``."""
+        with self._lock:
+            for key in [k for k in self._data if k[:len(prefix)] == prefix]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+def upgrade_schema(engine):
+    """Crea los índices que falten en bases de datos creadas antes de que existieran.
+
+    create_all solo crea índices junto con tablas nuevas; en tablas ya
+    existentes hay que agregarlos explícitamente. También completa
+    student_stats para los alumnos que todavía no tienen fila.
+
+    En SQLite las tablas de historial usan AUTOINCREMENT para que un id no
+    se reutilice (alerts.py detecta cambios por id). SQLite no permite
+    agregarlo a una tabla existente: las bases creadas antes siguen
+    reutilizando ids hasta que se recrean, y aquí solo se avisa.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            for model in HISTORY_MODELS:
+                sql = connection.execute(
+                    text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {'name': model.__tablename__}
+                ).scalar()
+                if sql and 'AUTOINCREMENT' not in sql.upper():
+                    logger.warning("La tabla %s no usa AUTOINCREMENT: las alertas pueden no detectar "
+                                   "registros que reutilicen ids borrados", model.__tablename__)
+
+    with engine.begin() as connection:
+        missing = connection.execute(
+            select(Student.id).outerjoin(StudentStats).where(StudentStats.student_id.is_(None))
+        ).scalars().all()
+        if missing:
+            refresh_stats(connection, missing)
+
+def migrate(engine):
+    """Crea las tablas que falten, aplica upgrade_schema y los índices de búsqueda. Es idempotente."""
+    from search import install_search
+
+    Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    install_search(engine)
+
+_engine = None
+_session_factory = None
+_read_engine = None
+_read_session_factory = None
+_engine_lock = threading.Lock()
+_last_write = {}
+READ_YOUR_WRITES_SECONDS = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'))
+_read_cache = LRUCache(maxsize=int(os.getenv('DM_CACHE_SIZE', '256')))
+SUMMARY_TTL = int(os.getenv('DM_SUMMARY_TTL', '60'))
+DB_RETRIES = int(os.getenv('DB_RETRIES', '3'))
+DB_RETRY_BACKOFF = float(os.getenv('DB_RETRY_BACKOFF', '0.05'))
+
+def _within_window(timestamp):
+    return timestamp is not None and time.monotonic() - timestamp < READ_YOUR_WRITES_SECONDS
+
+def _env_flag(name):
+    return os.getenv(name, '').strip().lower() in ('1', 'true', 'yes')
+
+def get_engine():
+    """Devuelve el engine compartido por todo el proceso, creándolo la primera vez.
+
+    El tamaño del pool se configura con DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT y DB_POOL_RECYCLE; DB_ECHO=1 activa el log de SQL. El
+    esquema no se crea acá: hay que correr ``python data_manager.py migrate``
+    una vez por despliegue, o definir DB_AUTO_MIGRATE=1 (desarrollo local).
+    """
+    global _engine, _session_factory
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            database_url = os.getenv('DATABASE_URL')
+            if not database_url:
+                raise ValueError("DATABASE_URL environment variable not found")
+
+            try:
+                logger.info("Inicializando conexión a la base de datos...")
+                engine = create_engine(
+                    database_url,
+                    echo=_env_flag('DB_ECHO'),
+                    pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+                    max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
+                    pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '30')),
+                    pool_pre_ping=True,
+                    pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800'))
+                )
+
+                if _env_flag('DB_AUTO_MIGRATE'):
+                    migrate(engine)
+                _session_factory = sessionmaker(bind=engine)
+                _engine = engine
+                logger.info("Conexión a la base de datos establecida exitosamente")
+            except Exception as e:
+                logger.exception("Error initializing database: %s", e)
+                raise
+
+    return _engine
+
+def get_read_engine():
+    """Engine de solo lectura compartido (DATABASE_READ_URL), o el principal si no hay réplica."""
+    global _read_engine, _read_session_factory
+    read_url = os.getenv('DATABASE_READ_URL')
+    if not read_url:
+        return get_engine()
+    if _read_engine is not None:
+        return _read_engine
+
+    with _engine_lock:
+        if _read_engine is None:
+            logger.info("Inicializando conexión a la réplica de lectura...")
+            engine = create_engine(
+                read_url,
+                echo=_env_flag('DB_ECHO'),
+                pool_size=int(os.getenv('DB_READ_POOL_SIZE', os.getenv('DB_POOL_SIZE', '5'))),
+                max_overflow=int(os.getenv('DB_READ_MAX_OVERFLOW', os.getenv('DB_MAX_OVERFLOW', '10'))),
+                pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '30')),
                 pool_pre_ping=True,
-                pool_recycle=1800
+                pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800'))
             )
+            _read_session_factory = sessionmaker(bind=engine)
+            _read_engine = engine
 
-            Base.metadata.create_all(self.engine)
-            Session = sessionmaker(bind=self.engine)
-            self.session = Session()
-            print("Conexión a la base de datos establecida exitosamente")
-        except Exception as e:
-            print(f"Error initializing database: {str(e)}")
-            raise
+    return _read_engine
+
+def dispose_engine():
+    """Cierra las conexiones de los engines compartidos (p. ej. al apagar el proceso)."""
+    global _engine, _session_factory, _read_engine, _read_session_factory
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        if _read_engine is not None:
+            _read_engine.dispose()
+        _read_engine = None
+        _read_session_factory = None
+        _engine = None
+        _session_factory = None
+        _read_cache.clear()
+
+_TRANSIENT_PGCODES = {'40001', '40P01'}
+
+def _is_transient(error):
+    """Errores que se resuelven reintentando: conexión perdida, base bloqueada,
+    conflicto de serialización o deadlock."""
+    if error.connection_invalidated:
+        return True
+    if getattr(error.orig, 'pgcode', None) in _TRANSIENT_PGCODES:
+        return True
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+def _insert_ignore(dialect, model, index_elements):
+    """``INSERT ... ON CONFLICT DO NOTHING`` sobre ``index_elements`` para el dialecto dado."""
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Upsert no soportado en {dialect}")
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+def _parse_date(value):
+    if value is None:
+        return datetime.now().date()
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+class WriteBatch:
+    """Unidad de trabajo: junta varias altas y las guarda en una sola transacción.
+
+    Uso::
+
+        with data_manager.batch() as batch:
+            batch.add_attendance(student_id, 'Presente', '2024-03-01')
+            batch.add_note(student_id, 'Llegó sin materiales')
+        batch.results  # [{'operation', 'ok', 'error'}, ...] en el orden de carga
+
+    Los alumnos se resuelven con una sola consulta IN y cada tabla se inserta
+    con un insert multi-fila. Los ítems inválidos se informan como fallidos
+    sin impedir que se guarden los demás.
+    """
+    def __init__(self, manager):
+        self.manager = manager
+        self.items = []
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
 
     def add_course(self, course_name):
+        self.items.append(('add_course', {'name': course_name}))
+
+    def add_student(self, course, student_data):
+        self.items.append(('add_student', {
+            'course': course,
+            'first_name': student_data['nombre'],
+            'last_name': student_data['apellido']
+        }))
+
+    def add_attendance(self, student_id, status, date):
+        self.items.append(('add_attendance', {'student_id': student_id, 'status': status, 'date': date}))
+
+    def add_behavior_note(self, student_id, score, description, date=None):
+        self.items.append(('add_behavior_note', {
+            'student_id': student_id, 'score': score, 'description': description, 'date': date
+        }))
+
+    def add_assignment(self, student_id, title, status, date):
+        self.items.append(('add_assignment', {'student_id': student_id, 'title': title, 'status': status, 'date': date}))
+
+    def add_note(self, student_id, note, date=None):
+        self.items.append(('add_note', {'student_id': student_id, 'content': note, 'date': date}))
+
+    def _history_row(self, operation, values, open_from):
+        row = {'student_id': values['student_id'], 'date': _parse_date(values['date'])}
+        if open_from is not None and row['date'] < open_from:
+            raise ValueError("El año lectivo de esa fecha está cerrado")
+        if operation in ('add_attendance', 'add_assignment') and not values['status']:
+            raise ValueError("Falta el estado")
+        if operation == 'add_attendance':
+            if values['status'] not in ATTENDANCE_STATUSES:
+                raise ValueError(f"Estado de asistencia inválido: {values['status']}")
+            row['status'] = values['status']
+            return Attendance, row
+        if operation == 'add_behavior_note':
+            row['score'] = int(values['score'])
+            if not MIN_SCORE <= row['score'] <= MAX_SCORE:
+                raise ValueError(f"La calificación debe estar entre {MIN_SCORE} y {MAX_SCORE}")
+            row['description'] = values['description']
+            return Behavior, row
+        if operation == 'add_assignment':
+            if not values['title']:
+                raise ValueError("El trabajo necesita un título")
+            if values['status'] not in ASSIGNMENT_STATUSES:
+                raise ValueError(f"Estado de trabajo inválido: {values['status']}")
+            row['title'] = values['title']
+            row['status'] = values['status']
+            return Assignment, row
+        if not values['content']:
+            raise ValueError("La nota está vacía")
+        row['content'] = values['content']
+        return Note, row
+
+    def _apply(self, session):
+        self._errors = errors = {}
+        closed_until = open_from(session)
+        touched_courses, touched_students = set(), set()
+
+        course_names = {v['name'] for op, v in self.items if op == 'add_course'}
+        course_names |= {v['course'] for op, v in self.items if op == 'add_student'}
+        course_ids = dict(session.execute(
+            select(Course.name, Course.id).where(Course.name.in_(course_names))
+        ).all()) if course_names else {}
+
+        requested = {}
+        for index, (operation, values) in enumerate(self.items):
+            if operation != 'add_course':
+                continue
+            if not values['name'] or values['name'] in course_ids or values['name'] in requested:
+                errors[index] = "El curso ya existe" if values['name'] else "Nombre de curso vacío"
+            else:
+                requested[values['name']] = index
+        created_courses = set()
+        if requested:
+            created_courses = set(session.execute(
+                _insert_ignore(session.get_bind().dialect.name, Course, ['name'])
+                .values([{'name': name} for name in requested])
+                .returning(Course.name)
+            ).scalars())
+            for name in requested.keys() - created_courses:
+                errors[requested[name]] = "El curso ya existe"
+            course_ids.update(session.execute(
+                select(Course.name, Course.id).where(Course.name.in_(requested))
+            ).all())
+
+        new_students = []
+        for index, (operation, values) in enumerate(self.items):
+            if operation != 'add_student':
+                continue
+            if values['course'] not in course_ids:
+                errors[index] = "Curso inexistente"
+                continue
+            new_students.append(Student(
+                first_name=values['first_name'],
+                last_name=values['last_name'],
+                course_id=course_ids[values['course']],
+                stats=StudentStats(
+                    attendance_total=0, attendance_present=0, behavior_count=0,
+                    behavior_sum=0, assignments_total=0, assignments_delivered=0
+                )
+            ))
+            touched_courses.add(values['course'])
+        session.add_all(new_students)
+        session.flush()
+
+        history = [(index, operation, values) for index, (operation, values) in enumerate(self.items)
+                   if operation not in ('add_course', 'add_student')]
+        student_ids = {values['student_id'] for _, _, values in history}
+        known_students = set(session.execute(
+            select(Student.id).where(Student.id.in_(student_ids))
+        ).scalars()) if student_ids else set()
+
+        rows_by_model = {}
+        for index, operation, values in history:
+            if values['student_id'] not in known_students:
+                errors[index] = "Alumno inexistente"
+                continue
+            try:
+                model, row = self._history_row(operation, values, closed_until)
+            except (ValueError, TypeError) as e:
+                errors[index] = str(e)
+                continue
+            rows_by_model.setdefault(model, []).append(row)
+            touched_students.add(values['student_id'])
+
+        for model, rows in rows_by_model.items():
+            session.execute(insert(model), rows)
+        if touched_students:
+            refresh_stats(session, sorted(touched_students))
+        return errors, created_courses, touched_courses, touched_students
+
+    def commit(self):
+        """Guarda los ítems pendientes y devuelve ``results``."""
+        self._errors = {}
         try:
-            print(f"Intentando agregar curso: {course_name}")
-            existing_course = self.session.query(Course).filter_by(name=course_name).first()
-            if existing_course:
-                print(f"El curso {course_name} ya existe")
-                return False
+            errors, created_courses, touched_courses, touched_students = self.manager._run(self._apply, write=True)
+        except Exception as e:
+            logger.error("Error al guardar el lote: %s", e)
+            self.results = [
+                {'operation': operation, 'ok': False, 'error': self._errors.get(index, str(e))}
+                for index, (operation, _) in enumerate(self.items)
+            ]
+            self.items = []
+            return self.results
+
+        cache = self.manager.cache
+        if created_courses:
+            cache.invalidate(('courses',))
+        for course in touched_courses:
+            cache.invalidate(('students', course))
+        for student_id in touched_students:
+            cache.invalidate_prefix(('student_data', student_id))
+            cache.invalidate_prefix(('notes', student_id))
+        cache.invalidate(('school_summary',))
+
+        self.results = [
+            {'operation': operation, 'ok': index not in errors, 'error': errors.get(index)}
+            for index, (operation, _) in enumerate(self.items)
+        ]
+        self.items = []
+        return self.results
+
+@instrumentation.instrument_methods
+class DataManager:
+    """Fachada liviana por sesión de Streamlit sobre el engine compartido.
+
+    Si se pasa ``engine`` se usa ese en lugar del engine del proceso. Las
+    lecturas se sirven desde una caché LRU compartida por todas las sesiones
+    del mismo engine; los métodos add_* invalidan solo las entradas afectadas.
+
+    Las lecturas van a ``read_engine`` (DATABASE_READ_URL) salvo durante los
+    DB_READ_YOUR_WRITES_SECONDS posteriores a una escritura de esta misma
+    instancia, en los que se leen del principal para no ver datos atrasados.
+    Lo que se lee de la réplica mientras otra sesión acaba de escribir no se
+    guarda en la caché compartida, para no fijar datos atrasados para todos.
 
-            course = Course(name=course_name)
-            self.session.add(course)
-            print(f"Curso agregado a la sesión: {course_name}")
+    No guarda sesiones abiertas: cada operación usa una sesión propia (ver
+    ``_run``), así que una instancia se puede compartir entre hilos.
+    """
+    def __init__(self, engine=None, read_engine=None):
+        if engine is None:
+            self.engine = get_engine()
+            self._sessions = _session_factory
+            self.cache = _read_cache
+        else:
+            self.engine = engine
+            self._sessions = sessionmaker(bind=engine)
+            self.cache = LRUCache(maxsize=int(os.getenv('DM_CACHE_SIZE', '256')))
+
+        if read_engine is None and engine is None:
+            read_engine = get_read_engine()
+        self.read_engine = read_engine if read_engine is not None else self.engine
+        if self.read_engine is self.engine:
+            self._read_sessions = self._sessions
+        elif self.read_engine is _read_engine:
+            self._read_sessions = _read_session_factory
+        else:
+            self._read_sessions = sessionmaker(bind=self.read_engine)
+
+        self._last_write = None
+        self._local = threading.local()
+
+        instrumentation.install(self.engine)
+        instrumentation.install(self.read_engine)
+
+    def _run(self, operation, write=False):
+        """Ejecuta ``operation(session)`` en una sesión y transacción propias.
+
+        Cada llamada abre una sesión nueva y la cierra al terminar, así que
+        una misma instancia se puede usar desde varios hilos y un error no
+        deja la sesión inutilizable para la operación siguiente. Los errores
+        transitorios se reintentan hasta DB_RETRIES veces con espera
+        exponencial (DB_RETRY_BACKOFF); en cada intento la operación empieza
+        de cero. Las lecturas van a la réplica salvo después de una escritura
+        reciente de esta instancia.
+        """
+        for attempt in range(DB_RETRIES + 1):
+            sessions = self._sessions if write or _within_window(self._last_write) else self._read_sessions
+            if not write:
+                self._local.replica_lagging = (
+                    sessions is self._read_sessions and self.read_engine is not self.engine
+                    and _within_window(_last_write.get(self.engine))
+                )
             try:
-                self.session.commit()
-                print(f"Curso {course_name} agregado exitosamente")
-                return True
-            except Exception as commit_error:
-                print(f"Error al hacer commit del curso: {str(commit_error)}")
-                self.session.rollback()
-                return False
+                with sessions.begin() as session:
+                    result = operation(session)
+            except DBAPIError as e:
+                if attempt == DB_RETRIES or not _is_transient(e):
+                    raise
+                delay = DB_RETRY_BACKOFF * 2 ** attempt * (1 + random.random())
+                logger.warning("Error transitorio, reintento %d de %d en %.2fs: %s", attempt + 1, DB_RETRIES, delay, e.orig)
+                time.sleep(delay)
+                continue
+            if write:
+                self._mark_write()
+            return result
+
+    def _mark_write(self):
+        now = time.monotonic()
+        self._last_write = now
+        _last_write[self.engine] = now
+
+    def reader_engine(self):
+        """Engine para lecturas fuera de DataManager (p. ej. exportaciones).
+
+        Es el principal durante la ventana posterior a una escritura de esta
+        instancia y ``read_engine`` el resto del tiempo, como en ``_run``.
+        """
+        return self.engine if _within_window(self._last_write) else self.read_engine
+
+    def _cache_put(self, key, value, ttl=None):
+        """Guarda en la caché salvo que la última lectura viniera de una réplica posiblemente atrasada."""
+        if not getattr(self._local, 'replica_lagging', False):
+            self.cache.put(key, value, ttl=ttl)
+
+    def note_external_write(self):
+        """Avisa que se escribió en la base por fuera de DataManager (p. ej. con importer.py).
+
+        Vacía la caché y aplica la misma ventana de lectura sobre el
+        principal que tras una escritura propia.
+        """
+        self._mark_write()
+        self.cache.clear()
+
+    def add_course(self, course_name):
+        """Crea el curso si no existe. Devuelve False si ya existía o hubo un error."""
+        def operation(session):
+            return session.execute(
+                _insert_ignore(session.get_bind().dialect.name, Course, ['name'])
+                .values(name=course_name)
+                .returning(Course.id)
+            ).scalar() is not None
+
+        try:
+            created = self._run(operation, write=True)
         except Exception as e:
-            print(f"Error al agregar curso: {str(e)}")
-            self.session.rollback()
+            logger.error("Error al agregar curso: %s", e)
             return False
 
+        if not created:
+            logger.info("El curso %s ya existe", course_name)
+            return False
+        self.cache.invalidate(('courses',))
+        self.cache.invalidate(('school_summary',))
+        logger.info("Curso %s agregado exitosamente", course_name)
+        return True
+
+    def batch(self):
+        """Devuelve un WriteBatch para guardar varias altas en una sola transacción."""
+        return WriteBatch(self)
+
     def get_courses(self):
+        cached = self.cache.get(('courses',))
+        if cached is not None:
+            return cached
+
         try:
-            print("Obteniendo lista de cursos...")
-            courses = self.session.query(Course).all()
-            course_names = [course.name for course in courses]
-            print(f"Cursos encontrados: {course_names}")
+            course_names = self._run(lambda session: list(session.execute(select(Course.name)).scalars()))
+            self._cache_put(('courses',), course_names)
             return course_names
         except Exception as e:
-            print(f"Error al obtener cursos: {str(e)}")
+            logger.error("Error al obtener cursos: %s", e)
             return []
 
     def add_student(self, course, student_data):
-        try:
-            course_obj = self.session.query(Course).filter_by(name=course).first()
-            if not course_obj:
+        """Agrega un alumno al curso con un único INSERT ... SELECT sobre el nombre del curso."""
+        def operation(session):
+            student_id = session.execute(
+                insert(Student).from_select(
+                    ['first_name', 'last_name', 'course_id'],
+                    select(literal(student_data['nombre']), literal(student_data['apellido']), Course.id)
+                    .where(Course.name == course)
+                ).returning(Student.id)
+            ).scalar()
+            if student_id is None:
                 return False
-
-            student = Student(
-                first_name=student_data['nombre'],
-                last_name=student_data['apellido'],
-                course=course_obj
+            session.execute(
+                _insert_ignore(session.get_bind().dialect.name, StudentStats, ['student_id'])
+                .values(student_id=student_id, attendance_total=0, attendance_present=0, behavior_count=0,
+                        behavior_sum=0, assignments_total=0, assignments_delivered=0)
             )
-            self.session.add(student)
-            self.session.commit()
             return True
+
+        try:
+            if not self._run(operation, write=True):
+                return False
         except Exception as e:
-            self.session.rollback()
-            print(f"Error al agregar estudiante: {str(e)}")
+            logger.error("Error al agregar estudiante: %s", e)
             return False
 
+        self.cache.invalidate(('students', course))
+        self.cache.invalidate(('school_summary',))
+        return True
+
     def get_students(self, course):
-        course_obj = self.session.query(Course).filter_by(name=course).first()
-        if not course_obj:
-            return []
-        return [f"{student.last_name}, {student.first_name}" for student in course_obj.students]
+        """Lista de (id, "Apellido, Nombre") de los alumnos de un curso."""
+        key = ('students', course)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        rows = self._run(lambda session: session.execute(
+            select(Student.id, Student.last_name, Student.first_name)
+            .join(Course, Student.course_id == Course.id)
+            .where(Course.name == course)
+            .order_by(Student.last_name, Student.first_name)
+        ).all())
+        students = [(student_id, f"{last_name}, {first_name}") for student_id, last_name, first_name in rows]
+        self._cache_put(key, students)
+        return students
+
+    def get_student_data(self, student_id, start_date=None, end_date=None):
+        """Historial del alumno, opcionalmente acotado a [start_date, end_date]."""
+        key = ('student_data', student_id, start_date, end_date)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
 
-    def get_student_data(self, course, student_name):
-        last_name, first_name = student_name.split(", ")
-        student = self.session.query(Student).join(Course).filter(
-            Course.name == course,
-            Student.last_name == last_name,
-            Student.first_name == first_name
-        ).first()
+        def operation(session):
+            def history(model):
+                query = session.query(model).filter(model.student_id == student_id)
+                if start_date is not None:
+                    query = query.filter(model.date >= start_date)
+                if end_date is not None:
+                    query = query.filter(model.date <= end_date)
+                return query.order_by(model.date)
 
-        if not student:
             return {
-                'attendance': [],
-                'behavior': [],
-                'assignments': [],
-                'notes': []
+                'attendance': [{'date': str(a.date), 'status': a.status} for a in history(Attendance)],
+                'behavior': [{'date': str(b.date), 'score': b.score, 'description': b.description} for b in history(Behavior)],
+                'assignments': [{'date': str(a.date), 'title': a.title, 'status': a.status} for a in history(Assignment)],
+                'notes': [{'date': str(n.date), 'note': n.content} for n in history(Note)]
             }
 
-        return {
-            'attendance': [{'date': str(a.date), 'status': a.status} for a in student.attendances],
-            'behavior': [{'date': str(b.date), 'score': b.score, 'description': b.description} for b in student.behaviors],
-            'assignments': [{'date': str(a.date), 'title': a.title, 'status': a.status} for a in student.assignments],
-            'notes': [{'date': str(n.date), 'note': n.content} for n in student.notes]
-        }
-
-    def add_attendance(self, course, student_name, status, date):
-        last_name, first_name = student_name.split(", ")
-        student = self.session.query(Student).join(Course).filter(
-            Course.name == course,
-            Student.last_name == last_name,
-            Student.first_name == first_name
-        ).first()
-
-        if student:
-            attendance = Attendance(
-                student=student,
-                date=datetime.strptime(date, '%Y-%m-%d').date(),
-                status=status
-            )
-            self.session.add(attendance)
-            self.session.commit()
-
-    def add_behavior_note(self, course, student_name, score, description):
-        last_name, first_name = student_name.split(", ")
-        student = self.session.query(Student).join(Course).filter(
-            Course.name == course,
-            Student.last_name == last_name,
-            Student.first_name == first_name
-        ).first()
-
-        if student:
-            behavior = Behavior(
-                student=student,
-                date=datetime.now().date(),
-                score=score,
-                description=description
-            )
-            self.session.add(behavior)
-            self.session.commit()
-
-    def add_assignment(self, course, student_name, title, status, date):
-        last_name, first_name = student_name.split(", ")
-        student = self.session.query(Student).join(Course).filter(
-            Course.name == course,
-            Student.last_name == last_name,
-            Student.first_name == first_name
-        ).first()
-
-        if student:
-            assignment = Assignment(
-                student=student,
-                date=datetime.strptime(date, '%Y-%m-%d').date(),
-                title=title,
-                status=status
-            )
-            self.session.add(assignment)
-            self.session.commit()
-
-    def add_note(self, course, student_name, note):
-        last_name, first_name = student_name.split(", ")
-        student = self.session.query(Student).join(Course).filter(
-            Course.name == course,
-            Student.last_name == last_name,
-            Student.first_name == first_name
-        ).first()
-
-        if student:
-            note_obj = Note(
-                student=student,
-                date=datetime.now().date(),
-                content=note
+        data = self._run(operation)
+        self._cache_put(key, data)
+        return data
+
+    def _history_filter(self, query, model, student_id, start_date, end_date):
+        query = query.where(model.student_id == student_id)
+        if start_date is not None:
+            query = query.where(model.date >= start_date)
+        if end_date is not None:
+            query = query.where(model.date <= end_date)
+        return query
+
+    def _status_counts(self, model, student_id, start_date, end_date):
+        import pandas as pd
+
+        key = ('student_data', student_id, model.__tablename__ + '_counts', start_date, end_date)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        query = self._history_filter(
+            select(model.status, func.count(model.id)), model, student_id, start_date, end_date
+        ).group_by(model.status).order_by(model.status)
+        counts = pd.DataFrame(self._run(lambda session: session.execute(query).all()), columns=['status', 'count'])
+        self._cache_put(key, counts)
+        return counts
+
+    def get_attendance_counts(self, student_id, start_date=None, end_date=None):
+        """Cantidad de registros de asistencia por estado, agregada en la base de datos."""
+        return self._status_counts(Attendance, student_id, start_date, end_date)
+
+    def get_assignment_counts(self, student_id, start_date=None, end_date=None):
+        """Cantidad de trabajos por estado, agregada en la base de datos."""
+        return self._status_counts(Assignment, student_id, start_date, end_date)
+
+    def get_behavior_series(self, student_id, start_date=None, end_date=None, max_points=60):
+        """Promedio de conducta por día, semana o mes, con a lo sumo ``max_points`` puntos.
+
+        El período se elige según el rango de fechas; si ni siquiera por mes
+        entra en el presupuesto, se agrupan varios meses por punto.
+        """
+        import pandas as pd
+
+        key = ('student_data', student_id, 'behavior_series', start_date, end_date, max_points)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        def operation(session):
+            first, last = session.execute(self._history_filter(
+                select(func.min(Behavior.date), func.max(Behavior.date)), Behavior, student_id, start_date, end_date
+            )).one()
+            if first is None:
+                return []
+
+            span = (last - first).days + 1
+            period = 'day' if span <= max_points else 'week' if span / 7 <= max_points else 'month'
+
+            bucket = _period_start(Behavior.date, period, session.get_bind().dialect.name).label('bucket')
+            query = self._history_filter(
+                select(bucket, func.sum(Behavior.score), func.count(Behavior.id)), Behavior, student_id, start_date, end_date
+            ).group_by(bucket).order_by(bucket)
+            return session.execute(query).all()
+
+        rows = self._run(operation)
+        if not rows:
+            series = pd.DataFrame(columns=['date', 'score', 'count'])
+            self._cache_put(key, series)
+            return series
+
+        series = pd.DataFrame(rows, columns=['date', 'total', 'count'])
+
+        if len(series) > max_points:
+            group = pd.Series(range(len(series))) // -(-len(series) // max_points)
+            series = series.groupby(group).agg(date=('date', 'first'), total=('total', 'sum'), count=('count', 'sum'))
+        series['score'] = (series['total'] / series['count']).round(2)
+        series = series[['date', 'score', 'count']].reset_index(drop=True)
+        self._cache_put(key, series)
+        return series
+
+    def get_notes(self, student_id, before=None, limit=20):
+        """Página de notas del alumno, de la más reciente a la más antigua.
+
+        ``before`` es el cursor ``(fecha, id)`` devuelto por la página anterior.
+        Devuelve ``(notas, cursor)``; ``cursor`` es None cuando no hay más.
+        """
+        key = ('notes', student_id, before, limit)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        query = select(Note.id, Note.date, Note.content).where(Note.student_id == student_id)
+        if before is not None:
+            before_date, before_id = before
+            query = query.where(
+                (Note.date < before_date) | ((Note.date == before_date) & (Note.id < before_id))
             )
-            self.session.add(note_obj)
-            self.session.commit()
+        query = query.order_by(Note.date.desc(), Note.id.desc()).limit(limit + 1)
+        rows = self._run(lambda session: session.execute(query).all())
+
+        notes = [{'date': str(n.date), 'note': n.content} for n in rows[:limit]]
+        cursor = (rows[limit - 1].date, rows[limit - 1].id) if len(rows) > limit else None
+        page = (notes, cursor)
+        self._cache_put(key, page)
+        return page
+
+    def _open_from(self):
+        """open_from cacheado por DM_SUMMARY_TTL segundos."""
+        cached = self.cache.get(('open_from',))
+        if cached is None:
+            cached = (self._run(open_from),)
+            self._cache_put(('open_from',), cached, ttl=SUMMARY_TTL)
+        return cached[0]
+
+    def get_open_from(self):
+        """Primer día en que se puede registrar, o None si nunca se cerró un año lectivo."""
+        return self._open_from()
+
+    def _is_frozen(self, day):
+        closed_until = self._open_from()
+        if closed_until is not None and day < closed_until:
+            logger.error("El año lectivo de %s está cerrado", day)
+            return True
+        return False
+
+    def _add_record(self, model, values, **increments):
+        if self._is_frozen(values['date']):
+            return False
+
+        def operation(session):
+            session.execute(insert(model).values(values))
+            if increments:
+                result = session.execute(
+                    update(StudentStats)
+                    .where(StudentStats.student_id == values['student_id'])
+                    .values({
+                        column: getattr(StudentStats, column) + amount
+                        for column, amount in increments.items()
+                    })
+                )
+                if result.rowcount == 0:
+                    refresh_stats(session, [values['student_id']])
+
+        try:
+            self._run(operation, write=True)
+        except Exception as e:
+            logger.error("Error al registrar %s: %s", model.__tablename__, e)
+            return False
+
+        self.cache.invalidate_prefix(('student_data', values['student_id']))
+        if increments:
+            self.cache.invalidate(('school_summary',))
+        if model is Note:
+            self.cache.invalidate_prefix(('notes', values['student_id']))
+        return True
+
+    def add_attendance(self, student_id, status, date):
+        return self._add_record(Attendance, {
+            'student_id': student_id,
+            'date': datetime.strptime(date, '%Y-%m-%d').date(),
+            'status': status
+        }, attendance_total=1, attendance_present=int(status == 'Presente'))
+
+    def add_attendance_bulk(self, course, date, statuses):
+        """Registra la asistencia de todo un curso en una sola transacción.
+
+        ``statuses`` es un dict {student_id: estado}. Si ya había asistencia
+        cargada para esa fecha se reemplaza, así que reenviar la planilla no
+        duplica registros.
+        """
+        if isinstance(date, str):
+            date = datetime.strptime(date, '%Y-%m-%d').date()
+
+        try:
+            roster = dict(self.get_students(course))
+            rows = [
+                {'student_id': student_id, 'date': date, 'status': status}
+                for student_id, status in statuses.items()
+                if student_id in roster
+            ]
+            if not rows or self._is_frozen(date):
+                return False
+
+            student_ids = [row['student_id'] for row in rows]
+
+            def operation(session):
+                session.execute(
+                    delete(Attendance).where(
+                        Attendance.student_id.in_(student_ids),
+                        Attendance.date == date
+                    )
+                )
+                session.execute(insert(Attendance).values(rows))
+                refresh_stats(session, student_ids)
+
+            self._run(operation, write=True)
+        except Exception as e:
+            logger.error("Error al registrar asistencia del curso: %s", e)
+            return False
+
+        for student_id in student_ids:
+            self.cache.invalidate_prefix(('student_data', student_id))
+        self.cache.invalidate(('school_summary',))
+        return True
+
+    def add_behavior_note(self, student_id, score, description):
+        return self._add_record(Behavior, {
+            'student_id': student_id,
+            'date': datetime.now().date(),
+            'score': score,
+            'description': description
+        }, behavior_count=1, behavior_sum=score)
+
+    def add_assignment(self, student_id, title, status, date):
+        return self._add_record(Assignment, {
+            'student_id': student_id,
+            'date': datetime.strptime(date, '%Y-%m-%d').date(),
+            'title': title,
+            'status': status
+        }, assignments_total=1, assignments_delivered=int(status == 'Entregado'))
+
+    def add_note(self, student_id, note):
+        return self._add_record(Note, {
+            'student_id': student_id,
+            'date': datetime.now().date(),
+            'content': note
+        })
+
+    def get_active_alerts(self, course=None):
+        """Alertas vigentes (precalculadas por alerts.py), opcionalmente de un curso."""
+        import pandas as pd
+
+        query = (
+            select(Course.name, Student.id, Student.last_name, Student.first_name,
+                   Alert.kind, Alert.message, Alert.created_at)
+            .join(Student, Alert.student_id == Student.id)
+            .join(Course, Student.course_id == Course.id)
+            .where(Alert.active.is_(True))
+            .order_by(Course.name, Student.last_name, Student.first_name, Alert.kind)
+        )
+        if course is not None:
+            query = query.where(Course.name == course)
+        rows = self._run(lambda session: session.execute(query).all())
+        return pd.DataFrame(
+            [(c, sid, f"{last}, {first}", kind, message, created) for c, sid, last, first, kind, message, created in rows],
+            columns=['Curso', 'student_id', 'Alumno', 'Tipo', 'Detalle', 'Calculada']
+        )
+
+    def search_notes(self, query, course=None, page=0, page_size=20):
+        """Busca en notas y descripciones de conducta de toda la escuela (o de ``course``).
+
+        Devuelve ``(resultados, hay_más)`` ordenados por relevancia.
+        """
+        from search import search
+
+        return self._run(lambda session: search(session, query, course=course, limit=page_size, offset=page * page_size))
+
+    def get_course_summary(self, course):
+        """Resumen por alumno de un curso leído de la tabla student_stats."""
+        import pandas as pd
+
+        rows = self._run(lambda session: session.execute(summary_select([course])).all())
+        records = [summary_record(row) for row in rows]
+        return pd.DataFrame(records, columns=SUMMARY_COLUMNS).drop(columns=['Curso'])
+
+    def get_school_summary(self):
+        """Resumen por alumno de todos los cursos en una sola consulta.
+
+        Se cachea por DM_SUMMARY_TTL segundos y se invalida con cada alta
+        que cambia las estadísticas.
+        """
+        import pandas as pd
+
+        cached = self.cache.get(('school_summary',))
+        if cached is not None:
+            return cached
+
+        rows = self._run(lambda session: session.execute(summary_select()).all())
+        records = [summary_record(row) for row in rows]
+        summary = pd.DataFrame(records, columns=SUMMARY_COLUMNS)
+        self._cache_put(('school_summary',), summary, ttl=SUMMARY_TTL)
+        return summary
+
+    def get_history_frames(self, course=None, start_date=None):
+        """Historial en formato largo como DataFrames, para las funciones de analytics.py."""
+        import pandas as pd
+
+        def operation(session):
+            frames = {}
+            for key, model, columns in (
+                ('attendance', Attendance, [Attendance.status]),
+                ('behavior', Behavior, [Behavior.score]),
+                ('assignments', Assignment, [Assignment.status])
+            ):
+                query = (
+                    select(model.student_id, Student.course_id, model.date, *columns)
+                    .join(Student, model.student_id == Student.id)
+                )
+                if course is not None:
+                    query = query.join(Course, Student.course_id == Course.id).where(Course.name == course)
+                if start_date is not None:
+                    query = query.where(model.date >= start_date)
+                frames[key] = pd.read_sql(query, session.connection())
+            return frames
+
+        return self._run(operation)
+
+    def rebuild_stats(self):
+        """Recalcula student_stats completa a partir del historial (reparación)."""
+        try:
+            self._run(refresh_stats, write=True)
+            self.cache.invalidate(('school_summary',))
+            return True
+        except Exception as e:
+            logger.error("Error al recalcular estadísticas: %s", e)
+            return False
+
+    def get_school_years(self):
+        """Años lectivos cerrados, del más reciente al más antiguo."""
+        cached = self.cache.get(('school_years',))
+        if cached is not None:
+            return cached
+
+        years = self._run(lambda session: list(session.execute(
+            select(SchoolYear.year).order_by(SchoolYear.year.desc())
+        ).scalars()))
+        self._cache_put(('school_years',), years)
+        return years
+
+    def get_year_summary(self, school_year):
+        """Resumen por alumno de un año lectivo cerrado, leído de student_year_stats."""
+        import pandas as pd
+
+        rows = self._run(lambda session: session.execute(summary_select(school_year=school_year)).all())
+        return pd.DataFrame([summary_record(row) for row in rows], columns=SUMMARY_COLUMNS)
+
+    def close_school_year(self, year):
+        """Cierra el año lectivo ``year`` (ver close_school_year). Devuelve las filas archivadas o None."""
+        try:
+            archived = self._run(lambda session: close_school_year(session.connection(), year), write=True)
+        except Exception as e:
+            logger.error("Error al cerrar el año lectivo %s: %s", year, e)
+            return None
+
+        self.cache.clear()
+        return archived
 
     def export_to_csv(self, course):
-        course_obj = self.session.query(Course).filter_by(name=course).first()
-        if not course_obj:
+        if not self._run(lambda session: session.execute(select(Course.id).where(Course.name == course)).first()):
             return None
 
-        records = []
-        for student in course_obj.students:
-            attendance_rate = len([a for a in student.attendances if a.status == 'Presente']) / len(student.attendances) if student.attendances else 0
-            behavior_avg = sum(b.score for b in student.behaviors) / len(student.behaviors) if student.behaviors else 0
-            assignments_completed = len([a for a in student.assignments if a.status == 'Entregado'])
-
-            records.append({
-                'Alumno': f"{student.last_name}, {student.first_name}",
-                'Asistencia (%)': round(attendance_rate * 100, 2),
-                'Promedio Conducta': round(behavior_avg, 2),
-                'Trabajos Entregados': assignments_completed,
-                'Total Trabajos': len(student.assignments)
-            })
-
-        df = pd.DataFrame(records)
-        return df.to_csv(index=False)
\ No newline at end of file
+        df = self.get_course_summary(course)
+        return df.to_csv(index=False)
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de la base de datos")
+    parser.add_argument('command', choices=['migrate', 'rebuild-stats', 'close-year'])
+    parser.add_argument('--year', type=int, help="año lectivo a cerrar (close-year)")
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrate(get_engine())
+    elif args.command == 'rebuild-stats':
+        if not DataManager().rebuild_stats():
+            raise SystemExit(1)
+    elif args.command == 'close-year':
+        if args.year is None:
+            parser.error("close-year requiere --year")
+        if DataManager().close_school_year(args.year) is None:
+            raise SystemExit(1)
@@ -0,0 +1,161 @@
+"""Exportación en streaming de resúmenes o historial de uno, varios o todos los cursos.
+
+Las filas se leen con un cursor del lado del servidor en lotes de
+``batch_size`` y se escriben de a un lote, así la memoria usada no depende
+del tamaño de la base de datos. Parquet requiere ``pyarrow``.
+
+Los archivos de la app se guardan en un directorio por sesión dentro de
+EXPORT_DIR; sweep_exports borra los de sesiones inactivas por más de
+EXPORT_MAX_AGE segundos.
+"""
+import csv
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import Date, Float, Integer, select
+
+from data_manager import (
+    Course, Student, Attendance, Behavior, Assignment, Note,
+    SUMMARY_COLUMNS, summary_select, summary_record
+)
+
+HISTORY_TABLES = {
+    'attendance': (Attendance, ['status']),
+    'behavior': (Behavior, ['score', 'description']),
+    'assignments': (Assignment, ['title', 'status']),
+    'notes': (Note, ['content'])
+}
+DATASETS = ['summary'] + list(HISTORY_TABLES)
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+SUMMARY_TYPES = ['string', 'string', 'float', 'float', 'int', 'int']
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'estudiantecontrol_exports'))
+EXPORT_MAX_AGE = int(os.getenv('EXPORT_MAX_AGE', '3600'))
+
+def _history_select(table, courses=None):
+    model, columns = HISTORY_TABLES[table]
+    query = (
+        select(
+            Course.name.label('course'),
+            Student.id.label('student_id'),
+            Student.last_name.label('last_name'),
+            Student.first_name.label('first_name'),
+            model.date,
+            *[getattr(model, column) for column in columns]
+        )
+        .join(Student, model.student_id == Student.id)
+        .join(Course, Student.course_id == Course.id)
+        .order_by(Course.name, Student.id, model.date)
+    )
+    if courses is not None:
+        query = query.where(Course.name.in_(courses))
+    return query
+
+def _column_type(sql_type):
+    if isinstance(sql_type, Integer):
+        return 'int'
+    if isinstance(sql_type, Float):
+        return 'float'
+    if isinstance(sql_type, Date):
+        return 'date'
+    return 'string'
+
+def dataset_columns(dataset):
+    """Lista de ``(columna, tipo)`` de ``dataset``, con tipo 'int', 'float', 'date' o 'string'."""
+    if dataset not in DATASETS:
+        raise ValueError(f"Conjunto de datos desconocido: {dataset}")
+    if dataset == 'summary':
+        return list(zip(SUMMARY_COLUMNS, SUMMARY_TYPES))
+    return [(column.name, _column_type(column.type)) for column in _history_select(dataset).selected_columns]
+
+def stream_rows(engine, dataset, courses=None, batch_size=5000):
+    """Genera ``(columnas, filas)`` por lote; ``courses=None`` exporta toda la escuela.
+
+    Si no hay filas genera un único lote vacío, para que el archivo tenga
+    encabezado de todos modos.
+    """
+    columns = [name for name, _ in dataset_columns(dataset)]
+    query = summary_select(courses) if dataset == 'summary' else _history_select(dataset, courses)
+    empty = True
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for partition in result.partitions():
+            empty = False
+            if dataset == 'summary':
+                yield columns, [tuple(summary_record(row).values()) for row in partition]
+            else:
+                yield columns, [tuple(row) for row in partition]
+    if empty:
+        yield columns, []
+
+def write_csv(batches, fileobj):
+    """Escribe los lotes en ``fileobj`` (texto) a medida que llegan. Devuelve la cantidad de filas."""
+    writer = csv.writer(fileobj)
+    header_written = False
+    count = 0
+    for columns, rows in batches:
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+def write_parquet(batches, path, columns):
+    """Escribe los lotes como grupos de filas de un archivo Parquet.
+
+    ``columns`` es la lista de dataset_columns; fija el esquema, así que el
+    archivo es válido aunque no haya filas.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("La exportación a Parquet requiere el paquete pyarrow")
+
+    types = {'int': pa.int64(), 'float': pa.float64(), 'date': pa.date32(), 'string': pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for _, rows in batches:
+            if not rows:
+                continue
+            writer.write_table(pa.Table.from_pydict({
+                name: [row[i] for row in rows] for i, name in enumerate(schema.names)
+            }, schema=schema))
+            count += len(rows)
+    return count
+
+def export(engine, dataset, fmt='csv', courses=None, path=None, batch_size=5000):
+    """Exporta ``dataset`` a ``path`` (o a un archivo temporal). Devuelve ``(path, filas)``."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconocido: {fmt}")
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=f'.{fmt}', prefix=f'{dataset}_')
+        os.close(fd)
+
+    batches = stream_rows(engine, dataset, courses, batch_size)
+    if fmt == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            count = write_csv(batches, f)
+    else:
+        count = write_parquet(batches, path, dataset_columns(dataset))
+    return path, count
+
+def new_export_dir():
+    """Crea un directorio para los archivos de una sesión de la app dentro de EXPORT_DIR."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix='session_', dir=EXPORT_DIR)
+
+def sweep_exports(max_age=EXPORT_MAX_AGE):
+    """Borra los directorios de sesión sin cambios hace más de ``max_age`` segundos. Devuelve cuántos."""
+    if not os.path.isdir(EXPORT_DIR):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,247 @@
+"""Importación por lotes de cursos, alumnos e historial desde CSV.
+
+Los archivos se leen en bloques de ``chunk_size`` filas sin cargarlos
+completos en memoria. Cada bloque se inserta con una sentencia multi-fila
+(COPY en Postgres) y se confirma junto con el avance en ``import_progress``,
+de modo que una importación interrumpida se reanuda donde quedó. Si ninguna
+fila de un bloque tiene su curso o alumno cargado (p. ej. se importó el
+historial antes que los alumnos), la importación se detiene ahí sin guardar
+avance, para retomarla desde ese bloque una vez cargados.
+
+Columnas esperadas por tipo:
+
+    courses      name
+    students     course, last_name, first_name
+    attendance   course, last_name, first_name, date, status
+    behavior     course, last_name, first_name, date, score, description
+    assignments  course, last_name, first_name, date, title, status
+    notes        course, last_name, first_name, date, content
+"""
+import argparse
+import csv
+import io
+import logging
+import os
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import select, insert, update, tuple_
+
+from data_manager import (
+    Course, Student, Attendance, Behavior, Assignment, Note,
+    ImportProgress, get_engine, open_from, refresh_stats
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_KINDS = {
+    'attendance': (Attendance, ['date', 'status']),
+    'behavior': (Behavior, ['date', 'score', 'description']),
+    'assignments': (Assignment, ['date', 'title', 'status']),
+    'notes': (Note, ['date', 'content'])
+}
+KINDS = ['courses', 'students'] + list(HISTORY_KINDS)
+COLUMNS = {
+    'courses': ['name'],
+    'students': ['course', 'last_name', 'first_name'],
+    **{kind: ['course', 'last_name', 'first_name'] + columns for kind, (_, columns) in HISTORY_KINDS.items()}
+}
+
+def _chunks(reader, size):
+    while True:
+        chunk = list(islice(reader, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _student_key(row):
+    return (row['course'].strip(), row['last_name'].strip(), row['first_name'].strip())
+
+def _load_course_ids(connection):
+    return dict(connection.execute(select(Course.name, Course.id)).all())
+
+def _load_student_ids(connection):
+    rows = connection.execute(
+        select(Course.name, Student.last_name, Student.first_name, Student.id)
+        .join(Course, Student.course_id == Course.id)
+    ).all()
+    return {(course, last_name, first_name): student_id for course, last_name, first_name, student_id in rows}
+
+def _bulk_insert(connection, model, rows):
+    """Inserta ``rows`` en una sola sentencia; en Postgres usa COPY."""
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if row[c] is None else row[c] for c in columns])
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(
+            f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    else:
+        connection.execute(insert(model), rows)
+
+def _parse_history_row(kind, row, student_id):
+    values = {'student_id': student_id, 'date': datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()}
+    for column in HISTORY_KINDS[kind][1][1:]:
+        value = row.get(column)
+        if column == 'score':
+            value = int(value)
+        elif column != 'description' and not (value or '').strip():
+            raise ValueError(f"Falta {column}")
+        values[column] = value
+    return values
+
+def import_csv(engine, kind, fileobj, source, chunk_size=1000, resume=True, progress_callback=None):
+    """Importa un CSV de tipo ``kind`` leyendo ``fileobj`` en bloques.
+
+    ``source`` identifica el archivo para reanudar (p. ej. ruta y tamaño).
+    ``progress_callback(rows_committed)`` se llama después de cada bloque.
+    Devuelve un dict con las filas insertadas, omitidas (de ellas, sin curso o
+    alumno), los bloques confirmados, la fila desde la que se reanudó y, si
+    se detuvo, la fila en la que lo hizo (``stopped_at``).
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Tipo de importación desconocido: {kind}")
+
+    reader = csv.DictReader(fileobj)
+    missing = [column for column in COLUMNS[kind] if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Faltan columnas para {kind}: {', '.join(missing)}")
+    result = {'inserted': 0, 'skipped': 0, 'unresolved': 0, 'chunks': 0, 'resumed_from': 0, 'stopped_at': None}
+
+    with engine.connect() as connection:
+        course_ids = _load_course_ids(connection)
+        student_ids = _load_student_ids(connection) if kind != 'courses' else {}
+        closed_until = open_from(connection)
+        done = connection.execute(
+            select(ImportProgress.rows_committed).where(
+                ImportProgress.source == source, ImportProgress.kind == kind
+            )
+        ).scalar() if resume else None
+        connection.rollback()
+
+        if done:
+            for _ in islice(reader, done):
+                pass
+            result['resumed_from'] = done
+            logger.info("Reanudando importación de %s desde la fila %d", source, done)
+        rows_committed = done or 0
+
+        for chunk in _chunks(reader, chunk_size):
+            with connection.begin():
+                inserted, unresolved = _import_chunk(connection, kind, chunk, course_ids, student_ids, closed_until)
+                if unresolved == len(chunk):
+                    # Nada del bloque se pudo resolver: no se cuenta como avance.
+                    result['stopped_at'] = rows_committed
+                    logger.warning("Importación de %s detenida en la fila %d: faltan cursos o alumnos",
+                                   source, rows_committed)
+                    break
+                rows_committed += len(chunk)
+                progress = connection.execute(
+                    update(ImportProgress)
+                    .where(ImportProgress.source == source, ImportProgress.kind == kind)
+                    .values(rows_committed=rows_committed)
+                )
+                if progress.rowcount == 0:
+                    connection.execute(insert(ImportProgress).values(
+                        source=source, kind=kind, rows_committed=rows_committed
+                    ))
+
+            result['inserted'] += inserted
+            result['skipped'] += len(chunk) - inserted
+            result['unresolved'] += unresolved
+            result['chunks'] += 1
+            if progress_callback:
+                progress_callback(rows_committed)
+
+    logger.info("Importación de %s (%s) terminada: %s", source, kind, result)
+    return result
+
+def _import_chunk(connection, kind, chunk, course_ids, student_ids, closed_until=None):
+    """Inserta un bloque. Devuelve (filas insertadas, filas sin curso o alumno cargado)."""
+    if kind == 'courses':
+        names = {row['name'].strip() for row in chunk if row.get('name', '').strip()}
+        new_names = sorted(names - set(course_ids))
+        if new_names:
+            _bulk_insert(connection, Course, [{'name': name} for name in new_names])
+            course_ids.update(connection.execute(
+                select(Course.name, Course.id).where(Course.name.in_(new_names))
+            ).all())
+        return len(new_names), 0
+
+    if kind == 'students':
+        new_students = {}
+        unresolved = 0
+        for row in chunk:
+            key = _student_key(row)
+            if key[0] not in course_ids:
+                unresolved += 1
+            elif key not in student_ids:
+                new_students[key] = {'course_id': course_ids[key[0]], 'last_name': key[1], 'first_name': key[2]}
+        if not new_students:
+            return 0, unresolved
+        _bulk_insert(connection, Student, list(new_students.values()))
+        rows = connection.execute(
+            select(Student.course_id, Student.last_name, Student.first_name, Student.id)
+            .where(tuple_(Student.course_id, Student.last_name, Student.first_name).in_(
+                [(values['course_id'], values['last_name'], values['first_name']) for values in new_students.values()]
+            ))
+        ).all()
+        names_by_id = {course_id: name for name, course_id in course_ids.items()}
+        for course_id, last_name, first_name, student_id in rows:
+            student_ids[(names_by_id[course_id], last_name, first_name)] = student_id
+        refresh_stats(connection, [row[3] for row in rows])
+        return len(new_students), unresolved
+
+    model = HISTORY_KINDS[kind][0]
+    records = []
+    unresolved = 0
+    for row in chunk:
+        student_id = student_ids.get(_student_key(row))
+        if student_id is None:
+            unresolved += 1
+            continue
+        try:
+            record = _parse_history_row(kind, row, student_id)
+        except (ValueError, TypeError, KeyError):
+            logger.warning("Fila inválida omitida: %s", row)
+            continue
+        if closed_until is not None and record['date'] < closed_until:
+            logger.warning("Fila de un año lectivo cerrado omitida: %s", row)
+            continue
+        records.append(record)
+    _bulk_insert(connection, model, records)
+    if kind != 'notes' and records:
+        refresh_stats(connection, sorted({record['student_id'] for record in records}))
+    return len(records), unresolved
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Importa cursos, alumnos e historial desde CSV")
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('path')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--no-resume', action='store_true', help="ignorar el avance guardado")
+    args = parser.parse_args(argv)
+
+    source = f"{os.path.abspath(args.path)}:{os.path.getsize(args.path)}"
+    try:
+        with open(args.path, newline='', encoding='utf-8') as f:
+            result = import_csv(
+                get_engine(), args.kind, f, source,
+                chunk_size=args.chunk_size,
+                resume=not args.no_resume,
+                progress_callback=lambda rows: logger.info("%d filas confirmadas", rows)
+            )
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    print(result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_STATEMENTS = 5
+
+_local = threading.local()
+
+class QueryStats:
+    """Consultas, tiempo de base de datos y sentencias más lentas de un ámbito."""
+    def __init__(self, name):
+        self.name = name
+        self.query_count = 0
+        self.db_time = 0.0
+        self.slowest = []
+        self.methods = {}
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def record_query(self, statement, duration):
+        self.query_count += 1
+        self.db_time += duration
+        self.slowest.append((duration, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[SLOWEST_STATEMENTS:]
+
+    def record_method(self, stats):
+        calls, queries, db_time = self.methods.get(stats.name, (0, 0, 0.0))
+        self.methods[stats.name] = (calls + 1, queries + stats.query_count, db_time + stats.db_time)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'scope': self.name,
+            'queries': self.query_count,
+            'db_ms': round(self.db_time * 1000, 3),
+            'elapsed_ms': round(self.elapsed * 1000, 3) if self.elapsed is not None else None,
+            'slowest': [
+                {'ms': round(duration * 1000, 3), 'statement': " ".join(statement.split())[:200]}
+                for duration, statement in self.slowest
+            ],
+            'methods': {
+                name: {'calls': calls, 'queries': queries, 'db_ms': round(db_time * 1000, 3)}
+                for name, (calls, queries, db_time) in sorted(self.methods.items())
+            }
+        }
+
+def _active_scopes():
+    if not hasattr(_local, 'scopes'):
+        _local.scopes = []
+    return _local.scopes
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+    for stats in _active_scopes():
+        stats.record_query(statement, duration)
+
+def install(engine):
+    """Engancha los eventos de cursor del engine (idempotente)."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+@contextmanager
+def track(name, log=True):
+    """Registra las consultas ejecutadas en este hilo mientras dure el bloque.
+
+    Con ``log`` el resumen se emite como JSON en el logger ``instrumentation``.
+    """
+    stats = QueryStats(name)
+    scopes = _active_scopes()
+    scopes.append(stats)
+    try:
+        yield stats
+    finally:
+        scopes.remove(stats)
+        stats.finish()
+        if log:
+            logger.info(json.dumps(stats.as_dict(), ensure_ascii=False))
+
+def instrument_methods(cls):
+    """Decorador de clase: cada método público registra sus consultas en los ámbitos activos."""
+    for name, method in list(vars(cls).items()):
+        if name.startswith('_') or not callable(method):
+            continue
+        setattr(cls, name, _instrumented(f"{cls.__name__}.{name}", method))
+    return cls
+
+def _instrumented(name, method):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        parents = list(_active_scopes())
+        with track(name, log=False) as stats:
+            result = method(*args, **kwargs)
+        for parent in parents:
+            parent.record_method(stats)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(stats.as_dict(), ensure_ascii=False))
+        return result
+    return wrapper
@@ -1,5 +1,8 @@
+import logging
+import os
 import streamlit as st
-import pandas as pd
+import io
+import instrumentation
 from data_manager import DataManager
 from components import (
     render_student_form,
@@ -7,9 +10,25 @@ from components import (
     render_behavior_section,
     render_assignments_section,
     render_notes_section,
-    render_class_overview
+    render_class_overview,
+    render_school_dashboard,
+    render_roll_call,
+    render_quick_entry,
+    render_history_window,
+    render_search,
+    render_performance_panel
 )
 
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
+
+EXPORT_DATASET_LABELS = {
+    'summary': "Resumen por alumno",
+    'attendance': "Asistencia",
+    'behavior': "Conducta",
+    'assignments': "Trabajos",
+    'notes': "Notas"
+}
+
 # Initialize session state
 if 'data_manager' not in st.session_state:
     st.session_state.data_manager = DataManager()
@@ -26,15 +45,31 @@ def main():
     # Sidebar navigation
     page = st.sidebar.selectbox(
         "Navegación",
-        ["Gestión de Alumnos", "Vista General", "Exportar Datos"]
+        ["Gestión de Alumnos", "Tomar Asistencia", "Carga Rápida", "Vista General", "Panel Escolar", "Alertas", "Buscar", "Exportar Datos", "Importar Datos"]
     )
 
-    if page == "Gestión de Alumnos":
-        manage_students()
-    elif page == "Vista General":
-        class_overview()
-    else:
-        export_data()
+    with instrumentation.track(f"rerun:{page}") as stats:
+        if page == "Gestión de Alumnos":
+            manage_students()
+        elif page == "Tomar Asistencia":
+            roll_call()
+        elif page == "Carga Rápida":
+            quick_entry()
+        elif page == "Vista General":
+            class_overview()
+        elif page == "Panel Escolar":
+            school_dashboard()
+        elif page == "Alertas":
+            alerts_page()
+        elif page == "Buscar":
+            search_page()
+        elif page == "Importar Datos":
+            import_data()
+        else:
+            export_data()
+
+    if os.getenv('PERF_PANEL', '').lower() in ('1', 'true', 'yes'):
+        render_performance_panel(stats)
 
 def manage_students():
     col1, col2 = st.columns([1, 2])
@@ -69,30 +104,60 @@ def manage_students():
 
     with col2:
         if course:
-            students = st.session_state.data_manager.get_students(course)
+            students = dict(st.session_state.data_manager.get_students(course))
             selected_student = st.selectbox(
                 "Seleccionar Alumno",
-                options=["-Nuevo Alumno-"] + students
+                options=[None] + list(students),
+                format_func=lambda student_id: "-Nuevo Alumno-" if student_id is None else students[student_id]
             )
 
-            if selected_student == "-Nuevo Alumno-":
+            if selected_student is None:
                 render_student_form(course)
             else:
-                student_data = st.session_state.data_manager.get_student_data(course, selected_student)
-
+                start_date, end_date = render_history_window()
                 tabs = st.tabs(["Asistencia", "Conducta", "Trabajos", "Notas"])
 
                 with tabs[0]:
-                    render_attendance_section(course, selected_student)
+                    render_attendance_section(selected_student, start_date, end_date)
 
                 with tabs[1]:
-                    render_behavior_section(course, selected_student)
+                    render_behavior_section(selected_student, start_date, end_date)
 
                 with tabs[2]:
-                    render_assignments_section(course, selected_student)
+                    render_assignments_section(selected_student, start_date, end_date)
 
                 with tabs[3]:
-                    render_notes_section(course, selected_student)
+                    render_notes_section(selected_student)
+
+def roll_call():
+    courses = st.session_state.data_manager.get_courses()
+    if not courses:
+        st.info("No hay cursos disponibles. Por favor, agregue un curso en la sección de Gestión de Alumnos.")
+        return
+
+    course = st.selectbox(
+        "Seleccionar Curso",
+        options=courses,
+        key="roll_call_course"
+    )
+
+    if course:
+        render_roll_call(course)
+
+def quick_entry():
+    courses = st.session_state.data_manager.get_courses()
+    if not courses:
+        st.info("No hay cursos disponibles. Por favor, agregue un curso en la sección de Gestión de Alumnos.")
+        return
+
+    course = st.selectbox(
+        "Seleccionar Curso",
+        options=courses,
+        key="quick_entry_course"
+    )
+
+    if course:
+        render_quick_entry(course)
 
 def class_overview():
     st.subheader("Vista General del Curso")
@@ -109,26 +174,131 @@ def class_overview():
     if course:
         render_class_overview(course)
 
+def school_dashboard():
+    st.subheader("Panel Escolar")
+    render_school_dashboard()
+
+def alerts_page():
+    st.subheader("Alumnos en Riesgo")
+    courses = st.session_state.data_manager.get_courses()
+    course = st.selectbox("Curso", options=[None] + courses,
+                          format_func=lambda name: "Todos" if name is None else name)
+    alerts = st.session_state.data_manager.get_active_alerts(course)
+    if alerts.empty:
+        st.info("No hay alertas vigentes.")
+        return
+    st.caption(f"Última evaluación: {alerts['Calculada'].max():%Y-%m-%d %H:%M}")
+    st.dataframe(alerts.drop(columns=['student_id', 'Calculada']), hide_index=True)
+
+def search_page():
+    st.subheader("Buscar")
+    render_search(st.session_state.data_manager.get_courses())
+
 def export_data():
+    import exporter
+
     st.subheader("Exportar Datos")
     courses = st.session_state.data_manager.get_courses()
     if not courses:
         st.info("No hay cursos disponibles para exportar.")
         return
 
-    course = st.selectbox(
-        "Seleccionar Curso para Exportar",
+    selected_courses = st.multiselect(
+        "Seleccionar Cursos para Exportar (vacío = toda la escuela)",
         options=courses
     )
+    dataset = st.selectbox(
+        "Datos",
+        options=exporter.DATASETS,
+        format_func=lambda name: EXPORT_DATASET_LABELS[name]
+    )
+    fmt = st.radio("Formato", options=list(exporter.FORMATS), format_func=str.upper, horizontal=True)
+
+    if st.button("Exportar"):
+        exporter.sweep_exports()
+        previous = st.session_state.pop('export_file', None)
+        if previous and os.path.exists(previous['path']):
+            os.remove(previous['path'])
+        export_dir = st.session_state.get('export_dir')
+        if not export_dir or not os.path.isdir(export_dir):
+            export_dir = st.session_state.export_dir = exporter.new_export_dir()
+        try:
+            path, count = exporter.export(
+                st.session_state.data_manager.reader_engine(),
+                dataset,
+                fmt,
+                courses=selected_courses or None,
+                path=os.path.join(export_dir, f"{dataset}.{fmt}")
+            )
+        except RuntimeError as e:
+            st.error(str(e))
+            return
+        if count == 0:
+            os.remove(path)
+            st.info("No hay filas para exportar con esa selección.")
+            return
+        scope = "_".join(selected_courses) if selected_courses else "escuela"
+        st.session_state.export_file = {
+            'path': path,
+            'file_name': f"{scope}_{dataset}.{fmt}",
+            'mime': exporter.FORMATS[fmt]
+        }
+        st.success(f"{count} filas exportadas")
+
+    export_file = st.session_state.get('export_file')
+    if export_file and os.path.exists(export_file['path']):
+        def read_export(path=export_file['path']):
+            with open(path, 'rb') as f:
+                return f.read()
 
-    if course and st.button("Exportar a CSV"):
-        csv_data = st.session_state.data_manager.export_to_csv(course)
+        # Con un callable el archivo se lee recién al hacer clic, no en cada rerun.
         st.download_button(
-            label="Descargar CSV",
-            data=csv_data,
-            file_name=f"{course}_datos.csv",
-            mime="text/csv"
+            label="Descargar",
+            data=read_export,
+            file_name=export_file['file_name'],
+            mime=export_file['mime']
         )
 
+def import_data():
+    import importer
+
+    st.subheader("Importar Datos")
+    st.caption("Importe en orden: cursos, alumnos y luego el historial. Las columnas esperadas por tipo están en importer.py.")
+
+    kind = st.selectbox("Tipo de datos", importer.KINDS)
+    uploaded = st.file_uploader("Archivo CSV", type=["csv"])
+    chunk_size = st.number_input("Filas por bloque", min_value=100, max_value=50000, value=1000, step=100)
+    restart = st.checkbox("Reiniciar importación", help="Ignora el avance guardado de este archivo y lo importa desde el principio")
+
+    if uploaded and st.button("Importar"):
+        progress = st.empty()
+        try:
+            result = importer.import_csv(
+                st.session_state.data_manager.engine,
+                kind,
+                io.TextIOWrapper(uploaded, encoding='utf-8', newline=''),
+                source=f"{uploaded.name}:{uploaded.size}",
+                chunk_size=int(chunk_size),
+                resume=not restart,
+                progress_callback=lambda rows: progress.text(f"{rows} filas procesadas...")
+            )
+        except UnicodeDecodeError:
+            st.error("El archivo no está codificado en UTF-8. Guárdelo como CSV UTF-8 y vuelva a importarlo.")
+            return
+        except ValueError as e:
+            st.error(str(e))
+            return
+        finally:
+            st.session_state.data_manager.note_external_write()
+        resumed = f" (reanudada desde la fila {result['resumed_from']})" if result['resumed_from'] else ""
+        summary = f"{result['inserted']} filas insertadas, {result['skipped']} omitidas{resumed}"
+        if result['unresolved']:
+            summary += f"; {result['unresolved']} sin curso o alumno cargado"
+        if result['stopped_at'] is not None:
+            st.warning(f"Importación detenida en la fila {result['stopped_at'] + 1}: {summary}. Ningún curso o alumno "
+                       "de ese bloque existe; impórtelos primero y vuelva a subir el archivo.")
+        else:
+            st.success(f"Importación terminada: {summary}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,262 @@
+"""Libretas por alumno en HTML para toda la escuela, sin Streamlit.
+
+Cada curso se procesa en un proceso del pool: se leen de una vez la
+asistencia, conducta, trabajos y notas de todos sus alumnos y se escribe un
+HTML por alumno con los mismos gráficos que la app (charts.py). El resultado
+se entrega como un .zip con una carpeta por curso.
+
+Los gráficos se exportan como imagen estática SVG, lo que requiere el
+paquete ``kaleido``; sin él se insertan como gráficos interactivos que cargan
+plotly.js desde su CDN.
+
+Uso (desde EstudianteControl/)::
+
+    python reports.py --output libretas.zip --workers 4
+    python reports.py --course "1° A" --start 2024-03-01 --end 2024-07-15
+"""
+import argparse
+import html
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from sqlalchemy import select
+
+from data_manager import (
+    Course, Student, Attendance, Behavior, Assignment, Note, get_engine, dispose_engine
+)
+from utils import school_year_of, school_year_range
+
+logger = logging.getLogger(__name__)
+
+MAX_CHART_POINTS = 60
+
+PAGE = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; color: #222; }}
+table {{ border-collapse: collapse; margin-bottom: 1em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; }}
+.charts {{ display: flex; flex-wrap: wrap; gap: 1em; }}
+.charts > div {{ width: 480px; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>Curso: {course} &middot; Período: {start} a {end}</p>
+{body}
+</body>
+</html>
+"""
+
+def _slug(text):
+    return re.sub(r'[^\w.-]+', '_', text, flags=re.UNICODE).strip('_') or 'sin_nombre'
+
+def _chart_html(fig, static):
+    if static:
+        return f"<div>{fig.to_image(format='svg', width=480, height=360).decode('utf-8')}</div>"
+    return f"<div>{fig.to_html(full_html=False, include_plotlyjs='cdn', default_width='480px', default_height='360px')}</div>"
+
+def _table_html(headers, rows):
+    head = ''.join(f"<th>{html.escape(str(h))}</th>" for h in headers)
+    body = ''.join(
+        '<tr>' + ''.join(f"<td>{html.escape(str(value))}</td>" for value in row) + '</tr>'
+        for row in rows
+    )
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+def render_report(name, course, start, end, attendance, behavior, assignments, notes, static=True):
+    """HTML de la libreta de un alumno a partir de sus registros en formato largo."""
+    import analytics
+    import charts
+
+    sections = []
+
+    counts = attendance.groupby('status').size().rename('count').reset_index()
+    sections.append("<h2>Asistencia</h2>")
+    if counts.empty:
+        sections.append("<p>Sin registros.</p>")
+    else:
+        sections.append(_table_html(['Estado', 'Cantidad'], counts.itertuples(index=False)))
+
+    series = analytics.behavior_series(behavior, MAX_CHART_POINTS)
+    sections.append("<h2>Conducta</h2>")
+    if series.empty:
+        sections.append("<p>Sin registros.</p>")
+    else:
+        sections.append(f"<p>Promedio: {behavior['score'].mean():.2f} ({len(behavior)} registros)</p>")
+
+    sections.append("<h2>Trabajos</h2>")
+    if assignments.empty:
+        sections.append("<p>Sin registros.</p>")
+    else:
+        sections.append(_table_html(
+            ['Fecha', 'Título', 'Estado'],
+            assignments.sort_values('date')[['date', 'title', 'status']].itertuples(index=False)
+        ))
+
+    figures = []
+    if not counts.empty:
+        figures.append(charts.attendance_pie(counts))
+    if not series.empty:
+        figures.append(charts.behavior_line(series))
+    if not assignments.empty:
+        figures.append(charts.assignments_bar(assignments.groupby('status').size().rename('count').reset_index()))
+    if figures:
+        sections.append('<div class="charts">' + ''.join(_chart_html(fig, static) for fig in figures) + '</div>')
+
+    sections.append("<h2>Notas</h2>")
+    if notes.empty:
+        sections.append("<p>Sin notas.</p>")
+    else:
+        sections.append(_table_html(['Fecha', 'Nota'], notes.sort_values('date')[['date', 'content']].itertuples(index=False)))
+
+    return PAGE.format(
+        title=html.escape(f"Libreta de {name}"),
+        course=html.escape(course),
+        start=start,
+        end=end,
+        body='\n'.join(sections)
+    )
+
+def _fetch_course(connection, course_id, start, end):
+    import pandas as pd
+
+    frames = {}
+    for key, model, columns in (
+        ('attendance', Attendance, [Attendance.status]),
+        ('behavior', Behavior, [Behavior.score]),
+        ('assignments', Assignment, [Assignment.title, Assignment.status]),
+        ('notes', Note, [Note.content])
+    ):
+        query = (
+            select(model.student_id, model.date, *columns)
+            .join(Student, model.student_id == Student.id)
+            .where(Student.course_id == course_id, model.date >= start, model.date <= end)
+        )
+        frames[key] = pd.read_sql(query, connection)
+    return frames
+
+def _static_export_available():
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def generate_course(course_id, course, start, end, directory, static=None):
+    """Escribe las libretas de un curso en ``directory``/<curso>. Devuelve la cantidad de alumnos.
+
+    Usa el engine del proceso (DATABASE_URL), así que se puede llamar desde
+    un proceso del pool.
+    """
+    static = _static_export_available() if static is None else static
+    with get_engine().connect() as connection:
+        students = connection.execute(
+            select(Student.id, Student.last_name, Student.first_name)
+            .where(Student.course_id == course_id)
+            .order_by(Student.last_name, Student.first_name)
+        ).all()
+        frames = _fetch_course(connection, course_id, start, end)
+
+    course_dir = os.path.join(directory, _slug(course))
+    os.makedirs(course_dir, exist_ok=True)
+    by_student = {key: dict(tuple(frame.groupby('student_id'))) for key, frame in frames.items()}
+    for student_id, last_name, first_name in students:
+        records = {
+            key: by_student[key].get(student_id, frames[key].iloc[0:0])
+            for key in frames
+        }
+        name = f"{last_name}, {first_name}"
+        page = render_report(name, course, start, end, static=static, **records)
+        with open(os.path.join(course_dir, f"{_slug(f'{last_name}_{first_name}')}_{student_id}.html"), 'w',
+                  encoding='utf-8') as f:
+            f.write(page)
+    return len(students)
+
+def generate(output, courses=None, start=None, end=None, workers=None, static=None):
+    """Genera las libretas de ``courses`` (o de toda la escuela) en el zip ``output``.
+
+    Por defecto cubre el año lectivo en curso hasta hoy. Devuelve un dict con
+    alumnos, segundos y alumnos por segundo.
+    """
+    today = datetime.now().date()
+    start = start or school_year_range(school_year_of(today))[0]
+    end = end or today
+    workers = workers or os.cpu_count() or 1
+    if static is None:
+        static = _static_export_available()
+        if not static:
+            logger.warning("kaleido no está instalado: los gráficos se insertan como HTML interactivo")
+
+    query = select(Course.id, Course.name).order_by(Course.name)
+    if courses:
+        query = query.where(Course.name.in_(courses))
+    with get_engine().connect() as connection:
+        course_rows = connection.execute(query).all()
+    # Los procesos hijos crean sus propias conexiones; no heredan las del padre.
+    dispose_engine()
+
+    started = time.perf_counter()
+    students = 0
+    directory = tempfile.mkdtemp(prefix='libretas_')
+    try:
+        if workers <= 1 or len(course_rows) <= 1:
+            for course_id, course in course_rows:
+                students += generate_course(course_id, course, start, end, directory, static)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(generate_course, course_id, course, start, end, directory, static): course
+                    for course_id, course in course_rows
+                }
+                for future in as_completed(futures):
+                    count = future.result()
+                    students += count
+                    logger.info("Curso %s: %d libretas", futures[future], count)
+
+        base, _ = os.path.splitext(output)
+        archive = shutil.make_archive(base, 'zip', directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    elapsed = time.perf_counter() - started
+    result = {
+        'output': archive,
+        'courses': len(course_rows),
+        'students': students,
+        'seconds': round(elapsed, 2),
+        'students_per_second': round(students / elapsed, 1) if elapsed else 0.0
+    }
+    logger.info("Libretas generadas: %s", result)
+    return result
+
+def main(argv=None):
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
+    parser = argparse.ArgumentParser(description="Genera las libretas de los alumnos en HTML")
+    parser.add_argument('--output', default='libretas.zip', help="archivo .zip de salida")
+    parser.add_argument('--course', action='append', help="curso a incluir (se puede repetir)")
+    parser.add_argument('--start', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
+                        help="desde (AAAA-MM-DD); por defecto, inicio del año lectivo")
+    parser.add_argument('--end', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
+                        help="hasta (AAAA-MM-DD); por defecto, hoy")
+    parser.add_argument('--workers', type=int, help="procesos del pool (por defecto, CPUs)")
+    parser.add_argument('--interactive', action='store_true',
+                        help="insertar gráficos interactivos en lugar de imágenes")
+    args = parser.parse_args(argv)
+
+    result = generate(args.output, courses=args.course, start=args.start, end=args.end,
+                      workers=args.workers, static=False if args.interactive else None)
+    print(f"{result['students']} libretas de {result['courses']} cursos en {result['seconds']}s "
+          f"({result['students_per_second']} alumnos/s) -> {result['output']}")
+
+if __name__ == "__main__":
+    main()
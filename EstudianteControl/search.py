@@ -0,0 +1,127 @@
+"""Búsqueda de texto completo sobre notas y descripciones de conducta.
+
+En Postgres se usa una columna ``tsvector`` generada con índice GIN; en
+SQLite, tablas FTS5 de contenido externo mantenidas por triggers. En ambos
+casos el índice se actualiza en la misma sentencia que el INSERT, así que
+cualquier camino de escritura (add_note, add_behavior_note, lotes,
+importación) queda indexado. install_search se llama desde migrate().
+"""
+import re
+
+from sqlalchemy import text
+
+SEARCHABLE = [
+    # (tabla, columna de texto, tipo en los resultados)
+    ('notes', 'content', 'Nota'),
+    ('behaviors', 'description', 'Conducta')
+]
+
+def _install_postgresql(connection):
+    for table, column, _ in SEARCHABLE:
+        connection.execute(text(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('spanish', coalesce({column}, ''))) STORED"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN (search_vector)"
+        ))
+
+def _install_sqlite(connection):
+    for table, column, _ in SEARCHABLE:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': f'{table}_fts'}
+        ).first()
+        if exists:
+            continue
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+            f"{column}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts(rowid, {column}) VALUES (new.id, new.{column}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER {table}_fts_update AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+            f"INSERT INTO {table}_fts(rowid, {column}) VALUES (new.id, new.{column}); END"
+        ))
+        connection.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+
+def install_search(engine):
+    """Crea (si faltan) los índices de texto completo para el dialecto del engine."""
+    with engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            _install_postgresql(connection)
+        elif connection.dialect.name == 'sqlite':
+            _install_sqlite(connection)
+        else:
+            raise NotImplementedError(f"Búsqueda no soportada en {connection.dialect.name}")
+
+def _sqlite_match(query):
+    # Cada palabra como término entre comillas con prefijo: el usuario no
+    # puede inyectar sintaxis FTS5 y "bull" encuentra "bullying".
+    return " ".join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+def _hits_sql(dialect):
+    if dialect == 'postgresql':
+        parts = [
+            f"SELECT '{label}' AS kind, {table}.id AS id, {table}.student_id AS student_id, "
+            f"{table}.date AS date, {table}.{column} AS text, "
+            f"ts_rank({table}.search_vector, websearch_to_tsquery('spanish', :query)) AS rank "
+            f"FROM {table} WHERE {table}.search_vector @@ websearch_to_tsquery('spanish', :query)"
+            for table, column, label in SEARCHABLE
+        ]
+    else:
+        parts = [
+            f"SELECT '{label}' AS kind, {table}.id AS id, {table}.student_id AS student_id, "
+            f"{table}.date AS date, {table}.{column} AS text, -bm25({table}_fts) AS rank "
+            f"FROM {table}_fts JOIN {table} ON {table}.id = {table}_fts.rowid "
+            f"WHERE {table}_fts MATCH :query"
+            for table, column, label in SEARCHABLE
+        ]
+    return " UNION ALL ".join(parts)
+
+def search(connection, query, course=None, limit=20, offset=0):
+    """Resultados ordenados por relevancia.
+
+    Devuelve ``(resultados, hay_más)``; cada resultado es un dict con tipo,
+    alumno, curso, fecha y texto.
+    """
+    dialect = connection.get_bind().dialect.name if hasattr(connection, 'get_bind') else connection.dialect.name
+    if dialect == 'sqlite':
+        query = _sqlite_match(query)
+    if not query.strip():
+        return [], False
+
+    course_filter = "AND courses.name = :course" if course is not None else ""
+    statement = text(
+        f"SELECT hits.kind, hits.student_id, students.last_name, students.first_name, "
+        f"courses.name, hits.date, hits.text, hits.rank "
+        f"FROM ({_hits_sql(dialect)}) AS hits "
+        f"JOIN students ON students.id = hits.student_id "
+        f"JOIN courses ON courses.id = students.course_id "
+        f"WHERE 1 = 1 {course_filter} "
+        f"ORDER BY hits.rank DESC, hits.date DESC, hits.id DESC "
+        f"LIMIT :limit OFFSET :offset"
+    )
+    rows = connection.execute(statement, {
+        'query': query, 'course': course, 'limit': limit + 1, 'offset': offset
+    }).all()
+
+    results = [
+        {
+            'Tipo': kind,
+            'student_id': student_id,
+            'Alumno': f"{last_name}, {first_name}",
+            'Curso': course_name,
+            'Fecha': str(date),
+            'Texto': body
+        }
+        for kind, student_id, last_name, first_name, course_name, date, body, _ in rows[:limit]
+    ]
+    return results, len(rows) > limit
@@ -1,4 +1,11 @@
-from datetime import datetime
+import os
+from datetime import date, datetime, timedelta
+
+PRESENT_STATUS = 'Presente'
+DELIVERED_STATUS = 'Entregado'
+ATTENDANCE_STATUSES = (PRESENT_STATUS, 'Ausente', 'Tardanza')
+ASSIGNMENT_STATUSES = (DELIVERED_STATUS, 'Pendiente', 'Atrasado')
+MIN_SCORE, MAX_SCORE = 1, 10
 
 def validate_date(date_str):
     try:
@@ -9,7 +16,7 @@ def validate_date(date_str):
 def calculate_attendance_percentage(attendance_list):
     if not attendance_list:
         return 0
-    present_count = sum(1 for a in attendance_list if a['status'] == 'Presente')
+    present_count = sum(1 for a in attendance_list if a['status'] == PRESENT_STATUS)
     return (present_count / len(attendance_list)) * 100
 
 def calculate_behavior_average(behavior_list):
@@ -20,5 +27,37 @@ def calculate_behavior_average(behavior_list):
 def calculate_assignment_completion(assignments_list):
     if not assignments_list:
         return 0, 0
-    completed = sum(1 for a in assignments_list if a['status'] == 'Entregado')
+    completed = sum(1 for a in assignments_list if a['status'] == DELIVERED_STATUS)
     return completed, len(assignments_list)
+
+
+SCHOOL_YEAR_START_MONTH = int(os.getenv('SCHOOL_YEAR_START_MONTH', '3'))
+
+def school_year_of(day):
+    """Año lectivo al que pertenece ``day``, identificado por el año calendario en que empieza."""
+    return day.year if day.month >= SCHOOL_YEAR_START_MONTH else day.year - 1
+
+def school_year_range(year):
+    """(primer día, primer día del año siguiente) del año lectivo ``year``."""
+    return date(year, SCHOOL_YEAR_START_MONTH, 1), date(year + 1, SCHOOL_YEAR_START_MONTH, 1)
+
+
+HISTORY_WINDOWS = ["Últimos 30 días", "Trimestre actual", "Año lectivo", "Año actual", "Todo el historial"]
+
+def get_history_window(option, today=None):
+    """Devuelve (desde, hasta) para una de las opciones de HISTORY_WINDOWS.
+
+    "Todo el historial" devuelve (None, None): todo lo que no se archivó al
+    cerrar un año lectivo.
+    """
+    today = today or datetime.now().date()
+    if option == "Últimos 30 días":
+        return today - timedelta(days=30), today
+    if option == "Trimestre actual":
+        first_month = 3 * ((today.month - 1) // 3) + 1
+        return today.replace(month=first_month, day=1), today
+    if option == "Año lectivo":
+        return school_year_range(school_year_of(today))[0], today
+    if option == "Año actual":
+        return today.replace(month=1, day=1), today
+    return None, None